@@ -3,15 +3,21 @@
 import atexit
 import asyncio
 import gc
+import os
 import shutil
+import socket
 import sqlite3
 import uuid
 import duckdb
 import gradio as gr
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from pathlib import Path
 from typing import Generator, List, Tuple
 
 from any_chatbot.indexing import embed_and_index_all_docs
+from any_chatbot.metrics import MetricsCallbackHandler, render_prometheus
 from any_chatbot.prompts import system_message
 from any_chatbot.tools import initialize_retrieve_tool, initialize_sql_toolkit
 from any_chatbot.utils import load_environ_vars
@@ -24,6 +30,9 @@ load_environ_vars()
 ROOT = Path(__file__).parent
 TMP_DIR = ROOT / "tmp"
 TMP_DIR.mkdir(exist_ok=True)
+# kept outside TMP_DIR so re-uploaded images skip OCR across syncs;
+# deleted with the rest of the session data on exit
+OCR_CACHE_DIR = ROOT / "ocr_cache"
 
 
 class Session:
@@ -66,8 +75,9 @@ sess = Session()
 # shutdown hook that is called when session ends
 @atexit.register
 def _purge_all():
-    """Cleanup session data on program exit."""
+    """Cleanup session data and the OCR cache on program exit."""
     sess.cleanup()
+    shutil.rmtree(OCR_CACHE_DIR, ignore_errors=True)
 
 
 def _safe_copy(src: Path, dst_dir: Path):
@@ -120,6 +130,7 @@ def cb_upload_and_sync(files: List[gr.File]) -> Generator[Tuple[str, list], None
         db_path=sess.db_path,
         index_path=sess.index_path,
         load_data=True,
+        ocr_cache_dir=OCR_CACHE_DIR,
     )
     asyncio.set_event_loop(None)
     loop.close()
@@ -129,7 +140,7 @@ def cb_upload_and_sync(files: List[gr.File]) -> Generator[Tuple[str, list], None
     # build llm
     llm = init_chat_model("gemini-2.5-flash", model_provider="google_genai")
     # load tools
-    retrieve = initialize_retrieve_tool(vector_store)
+    retrieve = initialize_retrieve_tool(vector_store, rerank=True)
     sql_tools = initialize_sql_toolkit(llm, sess.db_path)
     # store on-disk state engines to be properly sess.cleanip() later
     for tool in sql_tools:
@@ -171,7 +182,10 @@ def cb_chat(hist: List[dict], msg: str) -> Tuple[List[dict], str]:
     for event in sess.agent.stream(
         {"messages": messages},
         stream_mode="values",
-        config={"configurable": {"thread_id": sess.sid}},
+        config={
+            "configurable": {"thread_id": sess.sid},
+            "callbacks": [MetricsCallbackHandler()],
+        },
     ):
         reply = event["messages"][-1].content
     hist.append({"role": "assistant", "content": reply})
@@ -191,5 +205,35 @@ with gr.Blocks(theme="default") as demo:
     sync_btn.click(cb_upload_and_sync, [file_box], [status_md, chatbox])
     user_in.submit(cb_chat, [chatbox, user_in], [chatbox, user_in])
 
+# serve the UI and a Prometheus /metrics endpoint from one server
+server = FastAPI()
+
+
+@server.get("/metrics")
+def metrics() -> PlainTextResponse:
+    """Expose pipeline metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
+
+
+server = gr.mount_gradio_app(server, demo.queue(), path="/")
+
+
+def pick_port(host: str, start: int = 7860, tries: int = 100) -> int:
+    """Return the first free port from `start`, like `gr.Blocks.launch()` does."""
+    for port in range(start, start + tries):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind((host, port))
+            except OSError:
+                continue
+            return port
+    raise OSError(f"No free port in {start}-{start + tries - 1} on {host}")
+
+
 if __name__ == "__main__":
-    demo.queue().launch()
+    # same env vars as `demo.launch()`, e.g. GRADIO_SERVER_NAME=0.0.0.0 in containers
+    host = os.environ.get("GRADIO_SERVER_NAME", "127.0.0.1")
+    port = os.environ.get("GRADIO_SERVER_PORT")
+    uvicorn.run(server, host=host, port=int(port) if port else pick_port(host))
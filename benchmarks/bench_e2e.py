@@ -0,0 +1,241 @@
+"""End-to-end benchmark of indexing, retrieval, SQL and agent turns, fully offline.
+
+Generates a synthetic corpus, then times `embed_and_index_all_docs`,
+`initialize_retrieve_tool`, `initialize_sql_toolkit` and the agent loop with
+a local hashing embedding model and a scripted chat model. Usage:
+
+    python -m benchmarks.bench_e2e --sizes small medium --out bench.json
+
+Peak RSS is process-wide and only grows, so run one size per process for
+isolated memory numbers.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import duckdb
+import numpy as np
+from langgraph.prebuilt import create_react_agent
+
+from any_chatbot.indexing import embed_and_index_all_docs
+from any_chatbot.prompts import system_message
+from any_chatbot.quantization import VECTOR_STORAGE
+from any_chatbot.rerank import RERANK, CrossEncoderReranker
+from any_chatbot.sharding import SHARD_BY
+from any_chatbot.tools import initialize_retrieve_tool, initialize_sql_toolkit
+from benchmarks.corpus import FORMATS, SIZES, WORDS, generate_corpus
+from benchmarks.fakes import (
+    HashingEmbedding,
+    ScriptedChatModel,
+    retrieve_then_sql_script,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options for the benchmark."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", nargs="+", default=["small"], choices=list(SIZES))
+    p.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    p.add_argument("--queries", type=int, default=100, help="Retrieve/SQL calls.")
+    p.add_argument("--turns", type=int, default=10, help="Agent turns.")
+    p.add_argument("--vector_storage", type=str, default="flat", choices=VECTOR_STORAGE)
+    p.add_argument("--shard_by", type=str, default=None, choices=SHARD_BY)
+    p.add_argument("--rerank", type=str, default="lexical", choices=RERANK)
+    p.add_argument("--out", type=Path, default=None, help="Write results as JSON.")
+    return p.parse_args()
+
+
+def peak_rss_mb() -> float:
+    """Return this process's peak resident set size in MB."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return maxrss / 1e6 if sys.platform == "darwin" else maxrss / 1e3
+
+
+def timed(fn: Callable, n: int) -> Dict[str, float]:
+    """Call `fn(i)` n times and return latency percentiles in milliseconds."""
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    ms = np.array(latencies) * 1e3
+    return {
+        "n": n,
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def _n_vectors(vector_store) -> int:
+    """Return the number of indexed vectors in a flat or sharded store."""
+    shards = getattr(vector_store, "shards", None)
+    if shards is not None:
+        return sum(s.index.ntotal for s in shards.values())
+    return vector_store.index.ntotal
+
+
+def _git_commit() -> str | None:
+    """Return the current git commit, if any, so runs can be compared."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_size(cfg: argparse.Namespace, size: str, work_dir: Path) -> Dict:
+    """Benchmark every stage on a corpus of the given size."""
+    data_dir = work_dir / "data"
+    db_path = work_dir / "db" / "bench.duckdb"
+    index_path = work_dir / "db" / "faiss_index"
+    formats = list(cfg.formats)
+    if "image" in formats and shutil.which("tesseract") is None:
+        logger.warning("tesseract not found; skipping image corpus.")
+        formats.remove("image")
+
+    files = generate_corpus(data_dir, size, tuple(formats))
+    corpus_mb = sum(f.stat().st_size for f in data_dir.rglob("*") if f.is_file()) / 1e6
+    embeddings = HashingEmbedding()
+    index_kwargs = dict(
+        data_dir=data_dir,
+        db_path=db_path,
+        index_path=index_path,
+        vector_storage=cfg.vector_storage,
+        shard_by=cfg.shard_by,
+        embeddings=embeddings,
+    )
+
+    # INGESTION
+    start = time.perf_counter()
+    _, vector_store = embed_and_index_all_docs(load_data=True, **index_kwargs)
+    ingest_s = time.perf_counter() - start
+    n_files = sum(files.values())
+    ingestion = {
+        "seconds": ingest_s,
+        "files_per_s": n_files / ingest_s,
+        "mb_per_s": corpus_mb / ingest_s,
+        "vectors": _n_vectors(vector_store),
+        "embed_calls": embeddings.n_calls,
+        "embed_texts": embeddings.n_texts,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    # INDEX LOAD
+    start = time.perf_counter()
+    _, vector_store = embed_and_index_all_docs(load_data=False, **index_kwargs)
+    index_load = {"seconds": time.perf_counter() - start}
+
+    # RETRIEVE
+    rng = random.Random(0)
+    queries = [" ".join(rng.choices(WORDS, k=4)) for _ in range(cfg.queries)]
+    tags = [
+        tag
+        for tag, fmts in (
+            ("text_chunk", {"pdf", "txt"}),
+            ("image_text", {"image"}),
+            ("table_summary", {"csv", "xlsx"}),
+        )
+        if fmts & set(formats)
+    ]
+    retrieve = initialize_retrieve_tool(
+        vector_store,
+        rerank=cfg.rerank != "none",
+        scorer=CrossEncoderReranker() if cfg.rerank == "cross-encoder" else None,
+    )
+    retrieval = timed(
+        lambda i: retrieve.func(queries[i], tags[i % len(tags)]), cfg.queries
+    )
+
+    # SQL
+    with duckdb.connect(str(db_path), read_only=True) as con:
+        tables = [r[0] for r in con.execute("SHOW TABLES").fetchall()]
+    llm = ScriptedChatModel(script=[])
+    sql = None
+    sql_tools = []
+    if tables:
+        start = time.perf_counter()
+        sql_tools = initialize_sql_toolkit(llm, db_path)
+        init_s = time.perf_counter() - start
+        query_tool = next(t for t in sql_tools if t.name == "sql_db_query")
+        sql = timed(
+            lambda i: query_tool.invoke(
+                {
+                    "query": f"SELECT region, SUM(units * price) FROM "
+                    f"{tables[i % len(tables)]} GROUP BY region"
+                }
+            ),
+            cfg.queries,
+        )
+        sql["init_seconds"] = init_s
+
+    # AGENT TURNS
+    script = retrieve_then_sql_script(queries[0], tables[0] if tables else None)
+    llm.script = script
+    agent = create_react_agent(llm, [retrieve, *sql_tools], prompt=system_message)
+    agent_turns = timed(
+        lambda i: agent.invoke(
+            {"messages": [{"role": "user", "content": queries[i % len(queries)]}]}
+        ),
+        cfg.turns,
+    )
+    agent_turns["llm_calls_per_turn"] = len(script)
+
+    return {
+        "size": size,
+        "corpus": {"files": files, "mb": corpus_mb},
+        "ingestion": ingestion,
+        "index_load": index_load,
+        "retrieve": retrieval,
+        "sql": sql,
+        "agent_turn": agent_turns,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> None:
+    """Run the benchmark for every requested size and report JSON."""
+    logging.basicConfig(level=logging.WARNING)
+    cfg = parse_args()
+    runs: List[Dict] = []
+    for size in cfg.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            runs.append(run_size(cfg, size, Path(tmp)))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(cfg).items() if k != "out"},
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if cfg.out:
+        cfg.out.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
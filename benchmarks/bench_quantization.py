@@ -0,0 +1,143 @@
+"""Compare memory, query latency and recall of FAISS vector storage options.
+
+Runs offline on synthetic clustered vectors shaped like `embedding-001`
+(768-d). Memory is reported as the compressed index size, the size of the
+full-precision `exact_vectors.npy` file, how much of that file is resident
+after the queries (Linux only) and the process RSS. Usage:
+
+    python benchmarks/bench_quantization.py --n 20000 --out quant.json
+"""
+
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from any_chatbot.quantization import (
+    EXACT_VECTORS_FILE,
+    VECTOR_STORAGE,
+    compress_vector_store,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line options for the benchmark."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=20000, help="Number of vectors.")
+    p.add_argument("--dim", type=int, default=768, help="Vector dimension.")
+    p.add_argument("--queries", type=int, default=200, help="Number of queries.")
+    p.add_argument("--k", type=int, default=5, help="Top-k to retrieve.")
+    p.add_argument(
+        "--rerank_factor",
+        type=int,
+        default=None,
+        help="Candidates per result (default: per-storage default).",
+    )
+    p.add_argument("--out", type=Path, default=None, help="Write results as JSON.")
+    return p.parse_args()
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Return clustered float32 vectors, roughly like real text embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 100, 1), dim))
+    labels = rng.integers(0, len(centers), size=n)
+    return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def rss_mb() -> float:
+    """Return the current resident set size in MB (peak RSS if not on Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+        return kb / 1e3
+    except (OSError, StopIteration):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes on Linux
+        return maxrss / 1e6 if sys.platform == "darwin" else maxrss / 1e3
+
+
+def mapped_rss_mb(path: Path) -> float | None:
+    """Return how many MB of the memory-mapped `path` are resident (Linux only)."""
+    try:
+        with open("/proc/self/smaps") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    total_kb, in_mapping = 0, False
+    for line in lines:
+        fields = line.split()
+        if "-" in fields[0] and len(fields) >= 5:  # mapping header line
+            in_mapping = fields[-1] == str(path)
+        elif in_mapping and fields[0] == "Rss:":
+            total_kb += int(fields[1])
+    return total_kb / 1e3
+
+
+def main() -> None:
+    """Benchmark every storage option against the flat index."""
+    cfg = parse_args()
+    vectors = synthetic_vectors(cfg.n + cfg.queries, cfg.dim)
+    corpus, queries = vectors[: cfg.n], vectors[cfg.n :]
+    embedding = DeterministicFakeEmbedding(size=cfg.dim)
+    text_embeddings = [(f"doc {i}", v.tolist()) for i, v in enumerate(corpus)]
+
+    # ground truth from the exact flat index
+    flat_index = faiss.IndexFlatL2(cfg.dim)
+    flat_index.add(corpus)
+    _, truth = flat_index.search(queries, cfg.k)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage in VECTOR_STORAGE:
+            store = FAISS.from_embeddings(text_embeddings, embedding)
+            store = compress_vector_store(
+                store, storage, Path(tmp) / storage, cfg.rerank_factor
+            )
+            exact_fp = (Path(tmp) / storage / EXACT_VECTORS_FILE).resolve()
+            row_of = {doc_id: row for row, doc_id in store.index_to_docstore_id.items()}
+
+            latencies, hits = [], 0
+            for q, true_ids in zip(queries, truth):
+                start = time.perf_counter()
+                docs = store.similarity_search_with_score_by_vector(q.tolist(), k=cfg.k)
+                latencies.append(time.perf_counter() - start)
+                got = {row_of[d.id] for d, _ in docs}
+                hits += len(got & set(true_ids.tolist()))
+
+            results.append(
+                {
+                    "storage": storage,
+                    "index_mb": faiss.serialize_index(store.index).nbytes / 1e6,
+                    "exact_vectors_mb": (
+                        exact_fp.stat().st_size / 1e6 if exact_fp.exists() else 0.0
+                    ),
+                    "exact_vectors_rss_mb": mapped_rss_mb(exact_fp),
+                    "rss_mb": rss_mb(),
+                    "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+                    "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+                    f"recall@{cfg.k}": hits / (cfg.k * cfg.queries),
+                }
+            )
+
+    for r in results:
+        print(
+            "  ".join(
+                f"{k}={v:.3f}" if isinstance(v, float) else str(v) for k, v in r.items()
+            )
+        )
+    if cfg.out:
+        config = {k: v for k, v in vars(cfg).items() if k != "out"}
+        cfg.out.write_text(json.dumps({"config": config, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Synthetic corpora generators (PDF, TXT, CSV, XLSX, images) for benchmarks."""
+
+import random
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+from PIL import Image, ImageDraw
+
+FORMATS = ("pdf", "txt", "csv", "xlsx", "image")
+# files per format, paragraphs per document, rows per table
+SIZES: Dict[str, Dict[str, int]] = {
+    "small": {"files": 3, "paragraphs": 5, "rows": 100},
+    "medium": {"files": 20, "paragraphs": 20, "rows": 2000},
+    "large": {"files": 100, "paragraphs": 50, "rows": 20000},
+}
+
+WORDS = (
+    "revenue growth margin quarter forecast customer retention churn pricing "
+    "supply chain inventory logistics warehouse region europe asia americas "
+    "product launch marketing campaign brand loyalty annual report dividend "
+    "shareholder board strategy risk compliance audit sustainability carbon "
+    "energy cost headcount hiring training contract vendor software cloud "
+    "security incident latency throughput capacity roadmap milestone budget"
+).split()
+REGIONS = ["Europe", "Asia", "Americas", "Africa", "Oceania"]
+PRODUCTS = ["Widget", "Gadget", "Gizmo", "Doohickey", "Sprocket"]
+
+
+def paragraphs(rng: random.Random, n: int) -> List[str]:
+    """Return `n` paragraphs of pseudo-business prose."""
+    out = []
+    for _ in range(n):
+        sentences = [
+            " ".join(rng.choices(WORDS, k=rng.randint(8, 16))).capitalize() + "."
+            for _ in range(rng.randint(3, 6))
+        ]
+        out.append(" ".join(sentences))
+    return out
+
+
+def sales_table(rng: random.Random, rows: int) -> pd.DataFrame:
+    """Return a sales-like table with `rows` rows."""
+    return pd.DataFrame(
+        {
+            "order_id": range(rows),
+            "region": rng.choices(REGIONS, k=rows),
+            "product": rng.choices(PRODUCTS, k=rows),
+            "units": [rng.randint(1, 50) for _ in range(rows)],
+            "price": [round(rng.uniform(5, 500), 2) for _ in range(rows)],
+        }
+    )
+
+
+def _pdf_escape(line: str) -> str:
+    """Escape a line for use inside a PDF string literal."""
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, lines: List[str], lines_per_page: int = 55) -> None:
+    """Write a minimal text-only PDF (Helvetica, one line per text row)."""
+    pages = [
+        lines[i : i + lines_per_page] for i in range(0, len(lines), lines_per_page)
+    ] or [[]]
+    # objects: 1 catalog, 2 page tree, 3 font, then (page, content) per page
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(f"{pid} 0 R".encode() for pid in page_ids)
+        + f"] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for pid, page in zip(page_ids, pages):
+        text = "".join(f"({_pdf_escape(line)}) Tj T*\n" for line in page)
+        stream = f"BT /F1 10 Tf 12 TL 50 790 Td\n{text}ET".encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{off:010d} 00000 n \n".encode() for off in offsets)
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    path.write_bytes(bytes(out))
+
+
+def write_image(path: Path, lines: List[str]) -> None:
+    """Render text lines onto a white image, like a clean scan."""
+    img = Image.new("RGB", (1600, 40 + 32 * len(lines)), "white")
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(lines):
+        draw.text((20, 20 + 32 * i), line, fill="black", font_size=22)
+    img.save(path)
+
+
+def _wrap(text: str, width: int = 90) -> List[str]:
+    """Split text into lines of at most `width` characters."""
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return lines + [line] if line else lines
+
+
+def generate_corpus(
+    data_dir: Path,
+    size: str = "small",
+    formats: tuple = FORMATS,
+    seed: int = 0,
+) -> Dict[str, int]:
+    """Write a synthetic corpus under `data_dir`, one sub-folder per format.
+
+    Returns:
+        The number of files written per format.
+    """
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    counts = {}
+    for fmt in formats:
+        fmt_dir = data_dir / fmt
+        fmt_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(spec["files"]):
+            name = f"{fmt}_{i:04d}"
+            if fmt == "txt":
+                text = "\n\n".join(paragraphs(rng, spec["paragraphs"]))
+                (fmt_dir / f"{name}.txt").write_text(text)
+            elif fmt == "pdf":
+                lines = [
+                    line
+                    for p in paragraphs(rng, spec["paragraphs"])
+                    for line in _wrap(p) + [""]
+                ]
+                write_pdf(fmt_dir / f"{name}.pdf", lines)
+            elif fmt == "image":
+                # one scanned "page" per image regardless of size
+                write_image(fmt_dir / f"{name}.png", _wrap(paragraphs(rng, 1)[0]))
+            elif fmt == "csv":
+                sales_table(rng, spec["rows"]).to_csv(
+                    fmt_dir / f"{name}.csv", index=False
+                )
+            elif fmt == "xlsx":
+                with pd.ExcelWriter(fmt_dir / f"{name}.xlsx") as writer:
+                    for sheet in ("orders", "returns"):
+                        sales_table(rng, spec["rows"] // 2).to_excel(
+                            writer, sheet_name=sheet, index=False
+                        )
+            else:
+                raise ValueError(f"Unknown format {fmt!r}; use {FORMATS}")
+        counts[fmt] = spec["files"]
+    return counts
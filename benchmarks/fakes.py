@@ -0,0 +1,99 @@
+"""Offline stand-ins for the Gemini embedding model and chat model."""
+
+import zlib
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class HashingEmbedding(Embeddings):
+    """Deterministic bag-of-words embedding using signed feature hashing.
+
+    Texts sharing words get similar vectors, so retrieval results are
+    meaningful, and no network or model download is needed.
+    """
+
+    def __init__(self, size: int = 768):
+        """Create an embedding model producing `size`-d unit vectors."""
+        self.size = size
+        self.n_calls = 0
+        self.n_texts = 0
+
+    def _embed(self, text: str) -> List[float]:
+        """Embed a single text."""
+        vec = np.zeros(self.size, dtype=np.float32)
+        for token in text.lower().split():
+            h = zlib.crc32(token.encode())
+            vec[h % self.size] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of documents."""
+        self.n_calls += 1
+        self.n_texts += len(texts)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query."""
+        self.n_calls += 1
+        self.n_texts += 1
+        return self._embed(text)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replays a fixed list of messages, cycling forever.
+
+    Scripts usually end each turn with a plain answer, so one agent turn
+    consumes exactly one pass over the script.
+    """
+
+    script: List[AIMessage]
+    n_calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        """Identifier used by LangChain callbacks."""
+        return "scripted"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Return the next scripted message."""
+        message = self.script[self.n_calls % len(self.script)]
+        self.n_calls += 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        """Tools are already baked into the script."""
+        return self
+
+
+def retrieve_then_sql_script(query: str, table: str | None) -> List[AIMessage]:
+    """Script one agent turn: retrieve, run a SQL query on `table`, then answer.
+
+    The SQL step is left out when `table` is None.
+    """
+    retrieve_call = {
+        "name": "retrieve",
+        "args": {"query": query, "tag": "text_chunk"},
+        "id": "call_retrieve",
+    }
+    sql_call = {
+        "name": "sql_db_query",
+        "args": {"query": f"SELECT COUNT(*) FROM {table}"},
+        "id": "call_sql",
+    }
+    script = [AIMessage(content="", tool_calls=[retrieve_call])]
+    if table is not None:
+        script.append(AIMessage(content="", tool_calls=[sql_call]))
+    script.append(AIMessage(content="Here is a summary of what I found."))
+    return script
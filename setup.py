@@ -22,5 +22,8 @@ setup(
         "faiss-cpu",
         "langgraph-checkpoint-sqlite",
         "gradio",
+        "fastapi",
+        "uvicorn",
+        "pillow",
     ],
 )
@@ -10,8 +10,12 @@ from langgraph.checkpoint.sqlite import SqliteSaver
 from langchain.chat_models import init_chat_model
 
 from any_chatbot.indexing import embed_and_index_all_docs
+from any_chatbot.metrics import MetricsCallbackHandler, profile_run, render_prometheus
 from any_chatbot.tools import initialize_retrieve_tool, initialize_sql_toolkit
 from any_chatbot.prompts import system_message
+from any_chatbot.quantization import VECTOR_STORAGE
+from any_chatbot.rerank import RERANK, CrossEncoderReranker
+from any_chatbot.sharding import SHARD_BY
 from any_chatbot.utils import load_environ_vars
 
 logger = logging.getLogger(__name__)
@@ -60,6 +64,52 @@ def parse_args() -> argparse.Namespace:
         default="gemini-2.5-flash",
         help="LLM to use for the current session. More capable models perform better. Choose from models provided by 'google_genai'",
     )
+    p.add_argument(
+        "--vector_storage",
+        type=str,
+        default="flat",
+        choices=VECTOR_STORAGE,
+        help="Precision of the FAISS vectors when (re)building the index. 'float16', 'int8' and 'pq' use less memory and re-rank results exactly.",
+    )
+    p.add_argument(
+        "--rerank_factor",
+        type=int,
+        default=None,
+        help="Candidates fetched per result from a compressed index before exact re-ranking. Higher values improve recall at some latency cost. Defaults to the value saved with the index (4, or 32 for 'pq').",
+    )
+    p.add_argument(
+        "--shard_by",
+        type=str,
+        default=None,
+        choices=SHARD_BY,
+        help="If set, build one FAISS shard per source file or directory. Rebuilds only re-embed changed shards and searches run across shards in parallel.",
+    )
+    p.add_argument(
+        "--rerank",
+        type=str,
+        default="lexical",
+        choices=RERANK,
+        help="How 'retrieve' re-ranks a larger candidate pool before answering. 'cross-encoder' requires `pip install sentence-transformers`.",
+    )
+    p.add_argument(
+        "--token_budget",
+        type=int,
+        default=1200,
+        help="Max estimated tokens of passage text returned by each 'retrieve' call when re-ranking.",
+    )
+    p.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        choices=["cprofile", "pyinstrument"],
+        help="If set, profile this run and log the collected metrics at the end. 'pyinstrument' requires `pip install pyinstrument`.",
+    )
+    p.add_argument(
+        "--profile_out",
+        type=Path,
+        default=BASE / "profiles" / "profile",
+        help="Output path of the profile (.prof added for cProfile, .html for pyinstrument).",
+    )
     return p.parse_args()
 
 
@@ -68,16 +118,35 @@ def main() -> None:
     logging.basicConfig(level=logging.INFO)
     cfg = parse_args()
     load_environ_vars()
+    suffix = ".prof" if cfg.profile == "cprofile" else ".html"
+    with profile_run(cfg.profile, cfg.profile_out.with_suffix(suffix)):
+        run(cfg)
+    if cfg.profile:
+        logger.info(f"Metrics for this run:\n{render_prometheus()}")
+
+
+def run(cfg: argparse.Namespace) -> None:
+    """Index the data, build the agent and stream its answer to `cfg.ask`."""
     # INDEXING
     _, vector_store = embed_and_index_all_docs(
-        cfg.data_dir, cfg.database_dir, load_data=cfg.load_data
+        cfg.data_dir,
+        cfg.database_dir,
+        load_data=cfg.load_data,
+        vector_storage=cfg.vector_storage,
+        shard_by=cfg.shard_by,
+        rerank_factor=cfg.rerank_factor,
     )
 
     # BUILD LLM
     llm = init_chat_model(cfg.llm_name, model_provider="google_genai")
 
     # LOAD TOOLS
-    retrieve_tool = initialize_retrieve_tool(vector_store)
+    retrieve_tool = initialize_retrieve_tool(
+        vector_store,
+        rerank=cfg.rerank != "none",
+        scorer=CrossEncoderReranker() if cfg.rerank == "cross-encoder" else None,
+        token_budget=cfg.token_budget,
+    )
     sql_tools = initialize_sql_toolkit(llm, cfg.database_dir)
 
     # BUILD AGENT
@@ -93,7 +162,10 @@ def main() -> None:
 
     # PROMPT
     # specify an ID for the thread
-    config = {"configurable": {"thread_id": cfg.thread_id}}
+    config = {
+        "configurable": {"thread_id": cfg.thread_id},
+        "callbacks": [MetricsCallbackHandler()],
+    }
     # stream conversation
     for event in agent_executor.stream(
         {"messages": [{"role": "user", "content": cfg.ask}]},
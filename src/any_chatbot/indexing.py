@@ -2,19 +2,29 @@
 
 import os
 import re
+import json
+import time
+import hashlib
 import logging
+import tempfile
 import pandas as pd
 import duckdb
 import shutil
 from dotenv import load_dotenv
 from pathlib import Path
 from typing import List, Tuple
+from PIL import Image, ImageSequence, ImageStat
 
 from langchain_community.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.document_loaders import DirectoryLoader, UnstructuredFileLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from any_chatbot.metrics import InstrumentedEmbeddings, inc, observe, span
+from any_chatbot.quantization import compress_vector_store, load_vector_store
+from any_chatbot.sharding import ShardedFAISS, is_sharded, open_sharded_store
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -22,6 +32,14 @@ logger = logging.getLogger(__name__)
 BASE = Path(__file__).parent.parent.parent
 DATA = BASE / "data"
 
+# images larger than this (in pixels, longest side) are downsampled before OCR
+OCR_MAX_SIDE = 2000
+# grayscale std-dev below which an image is treated as blank (no text);
+# kept low so sparse text on large scans is never skipped
+BLANK_IMAGE_STDDEV = 1.0
+# OCR cache entries unused for longer than this are deleted on ingestion
+OCR_CACHE_MAX_AGE_DAYS = 30
+
 
 def load_and_split_text_docs(data_dir: Path) -> List[Document]:
     """Load PDFs, DOCX, PPTX, etc. and split into chunks suitable for embeddings."""
@@ -46,7 +64,8 @@ def load_and_split_text_docs(data_dir: Path) -> List[Document]:
         loader_cls=UnstructuredFileLoader,
     )
     logger.info("Loading text files...")
-    docs = loader.load()
+    with span("ingest.load"):
+        docs = loader.load()
     logger.info(f"Loaded {len(docs)} text files")
     # split
     text_splitter = RecursiveCharacterTextSplitter(
@@ -55,7 +74,8 @@ def load_and_split_text_docs(data_dir: Path) -> List[Document]:
         add_start_index=True,
         separators=["\n\n", "\n", " ", ""],
     )
-    text_chunks = text_splitter.split_documents(docs)
+    with span("ingest.split"):
+        text_chunks = text_splitter.split_documents(docs)
     logger.info(f"Split text chunks: {len(text_chunks)}")
     # tag
     for chunk in text_chunks:
@@ -64,8 +84,110 @@ def load_and_split_text_docs(data_dir: Path) -> List[Document]:
     return text_chunks
 
 
-def load_image_docs_as_text(data_dir: Path) -> List[Document]:
-    """Run OCR on images and return one Document per image."""
+def _file_digest(fp: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(fp, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _ocr_cache_key(digest: str, settings: dict) -> str:
+    """Combine an image digest with the OCR settings into a cache key."""
+    settings_str = json.dumps(settings, sort_keys=True)
+    return hashlib.sha256(f"{digest}:{settings_str}".encode()).hexdigest()
+
+
+def prune_ocr_cache(
+    cache_dir: Path, max_age_days: float = OCR_CACHE_MAX_AGE_DAYS
+) -> int:
+    """Delete OCR cache entries not used for `max_age_days`; return how many."""
+    cutoff = time.time() - max_age_days * 86400
+    n_pruned = 0
+    # also catches temporary files left behind by an interrupted write
+    for fp in cache_dir.iterdir():
+        if fp.is_file() and fp.stat().st_mtime < cutoff:
+            fp.unlink(missing_ok=True)
+            n_pruned += 1
+    if n_pruned:
+        logger.info(f"Pruned {n_pruned} stale OCR cache entries")
+    return n_pruned
+
+
+def _read_ocr_cache(cache_fp: Path) -> str | None:
+    """Return the cached OCR text, or None if the entry is missing or unreadable."""
+    try:
+        return json.loads(cache_fp.read_text())["text"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable OCR cache entry {cache_fp.name}: {e}")
+        return None
+
+
+def _write_ocr_cache(cache_fp: Path, entry: dict) -> None:
+    """Atomically write an OCR cache entry, so a crash never leaves half of one."""
+    with tempfile.NamedTemporaryFile(
+        "w", dir=cache_fp.parent, suffix=".tmp", delete=False
+    ) as f:
+        json.dump(entry, f)
+    os.replace(f.name, cache_fp)
+
+
+def _is_blank(frame: Image.Image) -> bool:
+    """Return True if an image frame is near-uniform (no text to OCR)."""
+    gray = frame.convert("L")
+    gray.thumbnail((1024, 1024))
+    return ImageStat.Stat(gray).stddev[0] < BLANK_IMAGE_STDDEV
+
+
+def _preprocess_image(fp: Path, out_dir: Path, max_side: int) -> Path | None:
+    """Prepare an image for OCR.
+
+    Returns None if every frame is near-blank (nothing to OCR), a downsampled
+    copy written to `out_dir` if any frame is larger than `max_side`, else
+    `fp` itself. Multi-page images (e.g. scanned TIFFs) keep all their pages.
+    """
+    with Image.open(fp) as img:
+        if all(_is_blank(frame) for frame in ImageSequence.Iterator(img)):
+            return None
+        if all(max(frame.size) <= max_side for frame in ImageSequence.Iterator(img)):
+            return fp
+        pages = []
+        for frame in ImageSequence.Iterator(img):
+            page = frame.convert("RGB")
+            page.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            pages.append(page)
+    if len(pages) == 1:
+        out = out_dir / f"{fp.stem}.png"
+        pages[0].save(out)
+    else:
+        out = out_dir / f"{fp.stem}.tiff"
+        pages[0].save(out, save_all=True, append_images=pages[1:])
+    return out
+
+
+def _ocr_image(fp: Path) -> str:
+    """Run OCR on a single image file and return the extracted text."""
+    docs = UnstructuredFileLoader(str(fp)).load()
+    return "\n\n".join(d.page_content for d in docs).strip()
+
+
+def load_image_docs_as_text(
+    data_dir: Path,
+    cache_dir: Path | None = None,
+    max_side: int = OCR_MAX_SIDE,
+) -> List[Document]:
+    """Run OCR on images and return one Document per image.
+
+    OCR results are cached in `cache_dir` keyed by image content and OCR
+    settings, so unchanged images are not OCR'd again on rebuilds; entries
+    unused for `OCR_CACHE_MAX_AGE_DAYS` are pruned. Oversized images are
+    downsampled to `max_side` pixels and blank ones are skipped.
+    """
+    if cache_dir is not None and cache_dir.exists():
+        prune_ocr_cache(cache_dir)
     image_text_docs = []
     globs = [
         "**/*.png",
@@ -79,18 +201,58 @@ def load_image_docs_as_text(data_dir: Path) -> List[Document]:
         return image_text_docs
 
     logger.info(f"Detected images under {data_dir}")
-    loader = DirectoryLoader(
-        str(data_dir),
-        glob=globs,
-        loader_cls=UnstructuredFileLoader,
-    )
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    settings = {"loader": "unstructured", "max_side": max_side, "frames": "all"}
+    image_paths = sorted({fp for p in globs for fp in data_dir.glob(p)})
+
     logger.info("Loading images' OCR texts...")
-    image_text_docs = loader.load()
-    logger.info(f"Loaded {len(image_text_docs)} image files")
-    # tag
-    for img in image_text_docs:
-        img.metadata["source_type"] = "image_text"
+    n_cached = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for fp in image_paths:
+            start = time.perf_counter()
+            key = _ocr_cache_key(_file_digest(fp), settings)
+            cache_fp = cache_dir / f"{key}.json" if cache_dir is not None else None
+
+            text = _read_ocr_cache(cache_fp) if cache_fp is not None else None
+            if text is not None:
+                cache_fp.touch()  # mark as recently used
+                n_cached += 1
+                inc("anyfile_ocr_images_total", outcome="cached")
+                logger.info(f"OCR cache hit for {fp.name}")
+            else:
+                ocr_input = _preprocess_image(fp, Path(tmp), max_side)
+                text = "" if ocr_input is None else _ocr_image(ocr_input)
+                elapsed = time.perf_counter() - start
+                observe("anyfile_stage_seconds", elapsed, stage="ingest.ocr")
+                inc(
+                    "anyfile_ocr_images_total",
+                    outcome="blank" if ocr_input is None else "ocr",
+                )
+                logger.info(f"OCR {fp.name}: {elapsed:.2f}s")
+                if cache_fp is not None:
+                    _write_ocr_cache(
+                        cache_fp,
+                        {
+                            "text": text,
+                            "settings": settings,
+                            "ocr_seconds": round(elapsed, 3),
+                        },
+                    )
+
+            if not text:
+                logger.info(f"No text found in {fp.name}; skipping.")
+                continue
+            image_text_docs.append(
+                Document(
+                    page_content=text,
+                    metadata={"source": str(fp), "source_type": "image_text"},
+                )
+            )
 
+    logger.info(
+        f"Loaded {len(image_text_docs)} image files ({n_cached} from OCR cache)"
+    )
     return image_text_docs
 
 
@@ -122,6 +284,7 @@ def build_duckdb_and_summary_cards(
         db_path.unlink()
     # start from an empty fresh DB
     with duckdb.connect(str(db_path)) as con:
+        load_start = time.perf_counter()
         # ingest .csv files into DuckDB (overwrite on rerun)
         for fp in data_dir.rglob("*.csv"):
             table = _tbl(fp.stem)
@@ -164,7 +327,14 @@ def build_duckdb_and_summary_cards(
             # .xls not supported by DuckDB
             logger.info(f"Skip {fp.name}: .xls not supported by DuckDB.")
 
+        observe(
+            "anyfile_stage_seconds",
+            time.perf_counter() - load_start,
+            stage="ingest.duckdb_load",
+        )
+
         # build summary cards from DuckDB
+        cards_start = time.perf_counter()
         tables = [r[0] for r in con.execute("SHOW TABLES").fetchall()]
         for tbl in tables:
             # DESCRIBE/PRAGMA to get columns & types
@@ -194,6 +364,11 @@ def build_duckdb_and_summary_cards(
                     },
                 )
             )
+        observe(
+            "anyfile_stage_seconds",
+            time.perf_counter() - cards_start,
+            stage="ingest.card_build",
+        )
 
     return summary_cards
 
@@ -203,35 +378,73 @@ def embed_and_index_all_docs(
     db_path: Path = DATA / "generated_db" / "csv_excel_to_db.duckdb",
     index_path: Path = DATA / "generated_db" / "faiss_index",
     load_data: bool = False,
-) -> Tuple[GoogleGenerativeAIEmbeddings, FAISS]:
-    """Return (embeddings, vector_store). Build or load FAISS & DuckDB as needed."""
+    ocr_cache_dir: Path | None = None,
+    vector_storage: str = "flat",
+    shard_by: str | None = None,
+    embeddings: Embeddings | None = None,
+    rerank_factor: int | None = None,
+) -> Tuple[Embeddings, FAISS | ShardedFAISS]:
+    """Return (embeddings, vector_store). Build or load FAISS & DuckDB as needed.
+
+    `ocr_cache_dir` defaults to an `ocr_cache` folder next to `index_path`.
+    `vector_storage` picks the precision of newly built indexes ("flat",
+    "float16", "int8" or "pq"); compressed indexes re-rank results exactly,
+    fetching `rerank_factor` candidates per result (saved with the index;
+    defaults to 4, or 32 for "pq").
+    `shard_by` ("file" or "dir") builds one FAISS shard per source file or
+    directory instead of a single index; rebuilds then only re-embed shards
+    whose documents changed. `embeddings` defaults to Google's `embedding-001`.
+    """
     # load embeedings and vector store
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    if embeddings is None:
+        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    embeddings = InstrumentedEmbeddings(embeddings)
 
     if not load_data and index_path.exists():
         # load existing FAISS index
-        vector_store = FAISS.load_local(
-            index_path, embeddings, allow_dangerous_deserialization=True
-        )
+        with span("index.load"):
+            if is_sharded(index_path):
+                vector_store = ShardedFAISS.load_local(
+                    index_path, embeddings, rerank_factor=rerank_factor
+                )
+            else:
+                vector_store = load_vector_store(index_path, embeddings, rerank_factor)
         logger.info("Loaded existing FAISS index and database.")
     else:
-        # delete old FAISS index if it exists
-        if index_path.exists():
+        # delete old FAISS index if it exists (sharded ones are synced in place)
+        if index_path.exists() and shard_by is None:
             logger.info("Reseting previous index...")
             shutil.rmtree(index_path)
 
         # LOAD AND SPLIT TEXT DOCS
         text_chunks = load_and_split_text_docs(data_dir)
         # LOAD IMAGES (OCR converts image -> text)
-        image_text_docs = load_image_docs_as_text(data_dir)
+        if ocr_cache_dir is None:
+            ocr_cache_dir = index_path.parent / "ocr_cache"
+        image_text_docs = load_image_docs_as_text(data_dir, ocr_cache_dir)
         # LOAD AND SPLIT CSV/EXCEL DOCS
         summary_cards = build_duckdb_and_summary_cards(data_dir, db_path)
 
-        # vector_store.add_documents(text_chunks + image_text_docs + summary_cards)
-        vector_store = FAISS.from_documents(
-            text_chunks + image_text_docs + summary_cards, embeddings
-        )
-        vector_store.save_local(index_path)
+        all_docs = text_chunks + image_text_docs + summary_cards
+        if shard_by is not None:
+            vector_store = open_sharded_store(
+                index_path, embeddings, shard_by, vector_storage, rerank_factor
+            )
+            vector_store.sync(all_docs, data_dir)
+        else:
+            texts = [doc.page_content for doc in all_docs]
+            with span("ingest.embed"):
+                vectors = embeddings.embed_documents(texts)
+            with span("ingest.faiss_build"):
+                vector_store = FAISS.from_embeddings(
+                    list(zip(texts, vectors)),
+                    embeddings,
+                    metadatas=[doc.metadata for doc in all_docs],
+                )
+                vector_store = compress_vector_store(
+                    vector_store, vector_storage, index_path, rerank_factor
+                )
+                vector_store.save_local(index_path)
         logger.info("Built and saved new FAISS index.")
 
     return embeddings, vector_store
@@ -0,0 +1,249 @@
+"""Lightweight tracing and metrics: stage timings, call/token counters, Prometheus export."""
+
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger(__name__)
+
+# histogram buckets in seconds, from a fast FAISS lookup to a slow OCR/LLM call
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+HELP = {
+    "anyfile_stage_seconds": "Wall time of pipeline stages, tool calls and agent steps.",
+    "anyfile_embedding_calls_total": "Calls to the embedding model.",
+    "anyfile_embedding_texts_total": "Texts sent to the embedding model.",
+    "anyfile_embedding_tokens_total": "Estimated tokens (chars / 4) sent to the embedding model.",
+    "anyfile_llm_calls_total": "Calls to the chat model.",
+    "anyfile_llm_tokens_total": "Chat model tokens reported by the provider.",
+    "anyfile_ocr_images_total": "Images seen by OCR, by outcome.",
+    "anyfile_sql_queries_total": "SQL queries run through the safety filter, by outcome.",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Registry:
+    """Thread-safe in-process store of counters and histograms."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> [bucket counts..., count, sum]
+        self.histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+
+    def inc(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        """Add `value` to a counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        """Record one observation in a histogram."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            h = series.setdefault(key, [0.0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += 1
+            h[-1] += value
+
+    def clear(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+REGISTRY = _Registry()
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format a label set as `{k="v",...}` (empty string if no labels)."""
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def inc(name: str, value: float = 1, **labels: str) -> None:
+    """Increment counter `name` by `value`."""
+    REGISTRY.inc(name, value, labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Record `value` in histogram `name`."""
+    REGISTRY.observe(name, value, labels)
+
+
+@contextmanager
+def span(stage: str, **labels: str) -> Iterator[None]:
+    """Time the enclosed block as `anyfile_stage_seconds{stage=...}`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("anyfile_stage_seconds", elapsed, stage=stage, **labels)
+        logger.debug(f"{stage} {labels or ''} took {elapsed:.3f}s")
+
+
+def render_prometheus() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    lines = []
+    with REGISTRY._lock:
+        for name, series in sorted(REGISTRY.counters.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_fmt_labels(key)} {value:g}")
+        for name, series in sorted(REGISTRY.histograms.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in sorted(series.items()):
+                for bound, n in zip(BUCKETS, h):
+                    le = _fmt_labels(key, ("le", f"{bound:g}"))
+                    lines.append(f"{name}_bucket{le} {n:g}")
+                inf = _fmt_labels(key, ("le", "+Inf"))
+                lines.append(f"{name}_bucket{inf} {h[-2]:g}")
+                lines.append(f"{name}_count{_fmt_labels(key)} {h[-2]:g}")
+                lines.append(f"{name}_sum{_fmt_labels(key)} {h[-1]:g}")
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper that counts calls, texts and estimated tokens."""
+
+    def __init__(self, inner: Embeddings):
+        """Wrap `inner`, forwarding every call to it."""
+        self.inner = inner
+
+    def _count(self, texts: List[str]) -> None:
+        """Record one embedding call over `texts`."""
+        inc("anyfile_embedding_calls_total")
+        inc("anyfile_embedding_texts_total", len(texts))
+        inc("anyfile_embedding_tokens_total", sum(len(t) for t in texts) // 4)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of documents."""
+        self._count(texts)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query."""
+        self._count([text])
+        return self.inner.embed_query(text)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that counts LLM calls/tokens and times agent steps.
+
+    Agent steps are the LangGraph nodes (e.g. "agent", "tools") and are
+    recorded as `anyfile_stage_seconds{stage="agent.step",node=...}`.
+    """
+
+    def __init__(self):
+        """Create a handler with no runs in flight."""
+        self._starts: Dict[UUID, Tuple[str, float]] = {}
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any):
+        """Count one chat model call."""
+        inc("anyfile_llm_calls_total")
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        """Count tokens reported in the model's usage metadata."""
+        for generations in response.generations:
+            for gen in generations:
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+                if usage:
+                    inc("anyfile_llm_tokens_total", usage["input_tokens"], kind="input")
+                    inc(
+                        "anyfile_llm_tokens_total",
+                        usage["output_tokens"],
+                        kind="output",
+                    )
+
+    def on_chain_start(
+        self,
+        serialized: Any,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Start timing a LangGraph node (but not the runnables nested inside it)."""
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None and kwargs.get("name") == node:
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the duration of a finished LangGraph node."""
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            observe(
+                "anyfile_stage_seconds",
+                time.perf_counter() - start,
+                stage="agent.step",
+                node=node,
+            )
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        """Forget a node that raised."""
+        self._starts.pop(run_id, None)
+
+
+@contextmanager
+def profile_run(mode: Optional[str], out_path: Path) -> Iterator[None]:
+    """Profile the enclosed block with "cprofile" or "pyinstrument" (no-op if None).
+
+    cProfile writes a `.prof` stats file and logs the top functions;
+    pyinstrument (installed separately) writes an HTML report.
+    """
+    if mode is None:
+        yield
+        return
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(out_path)
+            buf = io.StringIO()
+            pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(25)
+            logger.info(f"cProfile stats written to {out_path}\n{buf.getvalue()}")
+    elif mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError(
+                "pyinstrument profiling requires `pip install pyinstrument`."
+            ) from e
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            out_path.write_text(profiler.output_html())
+            logger.info(f"pyinstrument report written to {out_path}")
+    else:
+        raise ValueError(f"Unknown profile mode {mode!r}; use cprofile or pyinstrument")
@@ -0,0 +1,286 @@
+"""Reduced-precision FAISS storage (float16, int8, PQ) with exact re-ranking."""
+
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORAGE = ("flat", "float16", "int8", "pq")
+# full-precision vectors kept on disk next to the index for exact re-ranking
+EXACT_VECTORS_FILE = "exact_vectors.npy"
+# search settings saved with a compressed index, e.g. its rerank factor
+COMPRESSION_FILE = "compression.json"
+# candidates fetched per result before exact re-ranking; PQ codes are much
+# coarser, so PQ needs a larger pool to keep recall close to flat
+DEFAULT_RERANK_FACTOR = {"float16": 4, "int8": 4, "pq": 32}
+# PQ trains 256 centroids per sub-quantizer; below this, fall back to float16
+PQ_MIN_TRAINING_POINTS = 256
+
+
+def _pq_subquantizers(d: int, pq_m: int) -> int:
+    """Return the largest number of PQ sub-quantizers <= pq_m that divides d."""
+    return next(m for m in range(min(pq_m, d), 0, -1) if d % m == 0)
+
+
+def _storage_of(index: faiss.Index) -> str:
+    """Infer the `VECTOR_STORAGE` option a compressed index was built with."""
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if index.sq.qtype == faiss.ScalarQuantizer.QT_8bit:
+        return "int8"
+    return "float16"
+
+
+def build_compressed_index(
+    vectors: np.ndarray, storage: str, pq_m: int = 64
+) -> faiss.Index:
+    """Build and fill an L2 FAISS index storing `vectors` in the given precision.
+
+    Args:
+        vectors: float32 array of shape (n, d).
+        storage: One of `VECTOR_STORAGE`.
+        pq_m: Number of PQ sub-quantizers (bytes per vector) for "pq".
+
+    Returns:
+        A trained FAISS index containing all vectors. "pq" falls back to
+        "float16" when there are too few vectors to train the quantizer.
+    """
+    n, d = vectors.shape
+    if storage == "pq" and n < PQ_MIN_TRAINING_POINTS:
+        logger.info(
+            f"Only {n} vectors; using float16 instead of pq "
+            f"(needs {PQ_MIN_TRAINING_POINTS} to train)."
+        )
+        storage = "float16"
+    if storage == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif storage == "float16":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16)
+    elif storage == "int8":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit)
+    elif storage == "pq":
+        index = faiss.IndexPQ(d, _pq_subquantizers(d, pq_m), 8)
+    else:
+        raise ValueError(f"Unknown vector storage {storage!r}; use {VECTOR_STORAGE}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+class CompressedFAISS(FAISS):
+    """FAISS store that searches a compressed index and re-ranks exactly.
+
+    The compressed index returns `rerank_factor` times more candidates than
+    requested; those are re-scored against the full-precision vectors, which
+    are memory-mapped from disk. Pages around the rows a query touches are
+    paged in and count towards RSS, but as file-backed pages the OS can evict.
+    Adding documents rebuilds the compressed index from the stacked exact
+    vectors; `save_local` writes them next to the index.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        exact_vectors: np.ndarray,
+        rerank_factor: int = 4,
+        storage: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        """Wrap a compressed index; `exact_vectors` rows align with index ids.
+
+        `storage` is the requested `VECTOR_STORAGE` option (inferred from the
+        index if not given); it is used again when documents are added.
+        """
+        super().__init__(*args, **kwargs)
+        self.exact_vectors = exact_vectors
+        self.rerank_factor = rerank_factor
+        self.storage = storage or _storage_of(self.index)
+
+    def _add_vectors(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Append documents and rebuild the compressed index over all vectors."""
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        # validates ids before the index is touched
+        self.docstore.add(
+            {
+                id_: Document(id=id_, page_content=t, metadata=m)
+                for id_, t, m in zip(ids, texts, metadatas)
+            }
+        )
+        new = np.array(embeddings, dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(new)
+        # kept in memory until `save_local` writes and re-maps them
+        self.exact_vectors = np.vstack(
+            [np.asarray(self.exact_vectors, dtype=np.float32), new]
+        )
+        self.index = build_compressed_index(self.exact_vectors, self.storage)
+        start = len(self.index_to_docstore_id)
+        self.index_to_docstore_id.update({start + j: id_ for j, id_ in enumerate(ids)})
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed and add texts, rebuilding the compressed index."""
+        texts = list(texts)
+        return self._add_vectors(texts, self._embed_documents(texts), metadatas, ids)
+
+    def add_embeddings(
+        self,
+        text_embeddings: Iterable[Tuple[str, List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Add precomputed (text, embedding) pairs, rebuilding the compressed index."""
+        texts, embeddings = zip(*text_embeddings)
+        return self._add_vectors(list(texts), list(embeddings), metadatas, ids)
+
+    def save_local(self, folder_path: str, index_name: str = "index") -> None:
+        """Save the index, the exact vectors and the search settings."""
+        super().save_local(folder_path, index_name)
+        path = Path(folder_path)
+        exact_fp = path / EXACT_VECTORS_FILE
+        mapped = getattr(self.exact_vectors, "filename", None)
+        if mapped is None or Path(mapped).resolve() != exact_fp.resolve():
+            # write atomically: the old file may still be memory-mapped
+            tmp_fp = path / f"{EXACT_VECTORS_FILE}.tmp"
+            with open(tmp_fp, "wb") as f:
+                np.save(f, np.asarray(self.exact_vectors, dtype=np.float32))
+            os.replace(tmp_fp, exact_fp)
+            self.exact_vectors = np.load(exact_fp, mmap_mode="r")
+        settings = {"storage": self.storage, "rerank_factor": self.rerank_factor}
+        (path / COMPRESSION_FILE).write_text(json.dumps(settings))
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Return (doc, exact L2 distance) pairs, re-ranked at full precision."""
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+        n_candidates = (k if filter is None else fetch_k) * self.rerank_factor
+        _, indices = self.index.search(vector, n_candidates)
+        ids = indices[0][indices[0] != -1]
+        if len(ids) == 0:
+            return []
+
+        # exact re-rank; sorted ids keep memory-mapped reads sequential
+        ids = np.sort(ids)
+        exact = np.asarray(self.exact_vectors[ids], dtype=np.float32)
+        dists = ((exact - vector) ** 2).sum(axis=1)
+        order = np.argsort(dists, kind="stable")
+
+        if filter is not None:
+            filter_func = self._create_filter_func(filter)
+        score_threshold = kwargs.get("score_threshold")
+
+        docs = []
+        for j in order:
+            doc = self.docstore.search(self.index_to_docstore_id[int(ids[j])])
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for row {ids[j]}")
+            if filter is not None and not filter_func(doc.metadata):
+                continue
+            if score_threshold is not None and dists[j] > score_threshold:
+                continue
+            docs.append((doc, float(dists[j])))
+            if len(docs) == k:
+                break
+        return docs
+
+
+def compress_vector_store(
+    vector_store: FAISS,
+    storage: str,
+    index_path: Path,
+    rerank_factor: Optional[int] = None,
+) -> FAISS:
+    """Convert a flat FAISS store to `storage` precision with exact re-ranking.
+
+    The full-precision vectors are written to `index_path` and memory-mapped
+    back; call `save_local(index_path)` on the result to persist the index
+    and its search settings. `rerank_factor` defaults to
+    `DEFAULT_RERANK_FACTOR[storage]`.
+    """
+    if storage == "flat":
+        return vector_store
+    if rerank_factor is None:
+        rerank_factor = DEFAULT_RERANK_FACTOR[storage]
+
+    index = vector_store.index
+    vectors = index.reconstruct_n(0, index.ntotal).astype(np.float32)
+    index_path.mkdir(parents=True, exist_ok=True)
+    np.save(index_path / EXACT_VECTORS_FILE, vectors)
+
+    compressed = build_compressed_index(vectors, storage)
+    logger.info(
+        f"Compressed FAISS index to {storage}: "
+        f"{vectors.nbytes / 1e6:.1f} MB -> "
+        f"{faiss.serialize_index(compressed).nbytes / 1e6:.1f} MB resident"
+    )
+    return CompressedFAISS(
+        vector_store.embedding_function,
+        compressed,
+        vector_store.docstore,
+        vector_store.index_to_docstore_id,
+        exact_vectors=np.load(index_path / EXACT_VECTORS_FILE, mmap_mode="r"),
+        rerank_factor=rerank_factor,
+        storage=storage,
+    )
+
+
+def load_vector_store(
+    index_path: Path, embeddings: Embeddings, rerank_factor: Optional[int] = None
+) -> FAISS:
+    """Load a saved FAISS store, compressed or flat, from `index_path`.
+
+    `rerank_factor` overrides the one saved when the index was compressed.
+    """
+    vector_store = FAISS.load_local(
+        index_path, embeddings, allow_dangerous_deserialization=True
+    )
+    exact_fp = index_path / EXACT_VECTORS_FILE
+    if not exact_fp.exists():
+        return vector_store
+    settings_fp = index_path / COMPRESSION_FILE
+    settings = json.loads(settings_fp.read_text()) if settings_fp.exists() else {}
+    if rerank_factor is None:
+        rerank_factor = settings.get("rerank_factor", 4)
+    return CompressedFAISS(
+        embeddings,
+        vector_store.index,
+        vector_store.docstore,
+        vector_store.index_to_docstore_id,
+        exact_vectors=np.load(exact_fp, mmap_mode="r"),
+        rerank_factor=rerank_factor,
+        storage=settings.get("storage"),
+    )
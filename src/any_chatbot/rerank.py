@@ -0,0 +1,180 @@
+"""Re-ranking for `retrieve`: score a candidate pool, diversify with MMR, trim to a token budget."""
+
+import re
+from typing import Callable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+# re-ranking modes exposed on the command line
+RERANK = ("none", "lexical", "cross-encoder")
+# a scorer maps (query, candidate texts) to one relevance score per text
+Scorer = Callable[[str, List[str]], np.ndarray]
+
+# weight of the vector store's own ranking in the final relevance score
+DENSE_PRIOR_WEIGHT = 0.3
+# token estimate used for budgets, consistent with the embedding metrics
+CHARS_PER_TOKEN = 4
+# start of the sample-rows section of table summary cards (see indexing.py)
+SAMPLE_ROWS_MARKER = "\nSample rows"
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    """Lower-cased word tokens of `text`."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _term_matrix(texts: List[str], vocab: dict) -> np.ndarray:
+    """Term-frequency matrix (n_texts x len(vocab)) restricted to `vocab`."""
+    tf = np.zeros((len(texts), len(vocab)), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for tok in _tokens(text):
+            j = vocab.get(tok)
+            if j is not None:
+                tf[i, j] += 1
+    return tf
+
+
+def lexical_scores(
+    query: str, texts: List[str], k1: float = 1.2, b: float = 0.75
+) -> np.ndarray:
+    """Score texts against `query` with BM25, using the candidate pool as corpus."""
+    vocab = {tok: j for j, tok in enumerate(dict.fromkeys(_tokens(query)))}
+    if not vocab or not texts:
+        return np.zeros(len(texts), dtype=np.float32)
+    tf = _term_matrix(texts, vocab)
+    lengths = np.array([len(_tokens(t)) for t in texts], dtype=np.float32)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((len(texts) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0))
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+class CrossEncoderReranker:
+    """Local CPU cross-encoder scorer (requires `sentence-transformers`)."""
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+        """Load the cross-encoder `model_name` on CPU."""
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "Cross-encoder re-ranking requires `pip install sentence-transformers`."
+            ) from e
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def __call__(self, query: str, texts: List[str]) -> np.ndarray:
+        """Score every (query, text) pair."""
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        return np.asarray(self.model.predict([(query, t) for t in texts]))
+
+
+def _minmax(x: np.ndarray) -> np.ndarray:
+    """Scale scores to [0, 1] (all zeros if they are constant)."""
+    spread = x.max() - x.min() if len(x) else 0.0
+    if spread == 0:
+        return np.zeros(len(x), dtype=np.float32)
+    return (x - x.min()) / spread
+
+
+def mmr_select(
+    relevance: np.ndarray, similarity: np.ndarray, k: int, mmr_lambda: float
+) -> List[int]:
+    """Pick k indices by Maximal Marginal Relevance.
+
+    Args:
+        relevance: Relevance of each candidate to the query, in [0, 1].
+        similarity: Pairwise candidate similarity matrix, in [0, 1].
+        k: Number of candidates to select.
+        mmr_lambda: 1.0 ranks by relevance only; lower values favour diversity.
+    """
+    selected: List[int] = []
+    remaining = np.ones(len(relevance), dtype=bool)
+    max_sim = np.zeros(len(relevance), dtype=np.float32)
+    for _ in range(min(k, len(relevance))):
+        score = mmr_lambda * relevance - (1 - mmr_lambda) * max_sim
+        score[~remaining] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        remaining[best] = False
+        max_sim = np.maximum(max_sim, similarity[best])
+    return selected
+
+
+def _text_similarity(texts: List[str]) -> np.ndarray:
+    """Cosine similarity of bag-of-words vectors over the candidate pool."""
+    vocab: dict = {}
+    for text in texts:
+        for tok in _tokens(text):
+            vocab.setdefault(tok, len(vocab))
+    tf = _term_matrix(texts, vocab)
+    norms = np.linalg.norm(tf, axis=1, keepdims=True)
+    unit = tf / np.where(norms > 0, norms, 1.0)
+    return unit @ unit.T
+
+
+def _trim_table_card(text: str, budget_chars: int) -> str:
+    """Drop a table card's sample rows that do not fit; the schema is kept whole."""
+    head, marker, sample = text.partition(SAMPLE_ROWS_MARKER)
+    lines = (marker + sample).splitlines(keepends=True)
+    # the section title and column header line are useless without a row
+    if len(head) + sum(len(line) for line in lines[:4]) > budget_chars:
+        return head
+    for line in lines:
+        if len(head) + len(line) > budget_chars:
+            break
+        head += line
+    return head
+
+
+def trim_to_budget(docs: List[Document], token_budget: int) -> List[Document]:
+    """Keep docs in order until `token_budget` (estimated tokens) is spent.
+
+    The last doc that does not fit is cut at a word boundary. Table summary
+    cards are never dropped or cut inside their schema, which the agent needs
+    for SQL; only their sample rows are trimmed. Trimmed docs are copies, so
+    documents in the vector store are never modified.
+    """
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    kept = []
+    for doc in docs:
+        text = doc.page_content
+        if doc.metadata.get("source_type") == "table_summary":
+            if len(text) > budget_chars:
+                text = _trim_table_card(text, max(budget_chars, 0))
+        elif budget_chars <= 0:
+            break
+        elif len(text) > budget_chars:
+            text = text[:budget_chars].rsplit(" ", 1)[0] + " …"
+        if text != doc.page_content:
+            doc = Document(id=doc.id, page_content=text, metadata=doc.metadata)
+        kept.append(doc)
+        budget_chars -= len(text)
+    return kept
+
+
+def rerank(
+    query: str,
+    candidates: List[Document],
+    k: int,
+    scorer: Optional[Scorer] = None,
+    mmr_lambda: float = 0.7,
+    token_budget: Optional[int] = None,
+) -> List[Document]:
+    """Re-rank vector-store candidates and return the best k within the budget.
+
+    Relevance blends the scorer (lexical BM25 by default) with the vector
+    store's own ranking, then MMR removes near-duplicate passages.
+    """
+    if not candidates:
+        return []
+    scorer = scorer or lexical_scores
+    texts = [doc.page_content for doc in candidates]
+    dense_prior = 1.0 - np.arange(len(texts), dtype=np.float32) / len(texts)
+    scores = _minmax(scorer(query, texts))
+    relevance = (1 - DENSE_PRIOR_WEIGHT) * scores + DENSE_PRIOR_WEIGHT * dense_prior
+    order = mmr_select(relevance, _text_similarity(texts), k, mmr_lambda)
+    docs = [candidates[i] for i in order]
+    return trim_to_budget(docs, token_budget) if token_budget else docs
@@ -0,0 +1,353 @@
+"""Sharded FAISS store: one independent FAISS index per source file or directory."""
+
+import hashlib
+import heapq
+import json
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from any_chatbot.metrics import span
+from any_chatbot.quantization import compress_vector_store, load_vector_store
+
+logger = logging.getLogger(__name__)
+
+SHARD_BY = ("file", "dir")
+MANIFEST_FILE = "shards.json"
+# summary cards have no source file; they share one shard with the DuckDB tables
+TABLES_SHARD = "__tables__"
+
+
+def shard_key(doc: Document, data_dir: Optional[Path], shard_by: str) -> str:
+    """Return the shard a document belongs to: its source file or directory."""
+    source = doc.metadata.get("source")
+    if source is None:
+        return TABLES_SHARD
+    path = Path(source)
+    if data_dir is not None and path.is_relative_to(data_dir):
+        path = path.relative_to(data_dir)
+    if shard_by == "dir":
+        path = path.parent
+    return path.as_posix()
+
+
+def is_sharded(index_path: Path) -> bool:
+    """Return True if `index_path` holds a sharded index."""
+    return (index_path / MANIFEST_FILE).exists()
+
+
+def _fingerprint(docs: List[Document], vector_storage: str) -> str:
+    """Hash a shard's contents so unchanged shards are not rebuilt."""
+    h = hashlib.sha256(vector_storage.encode())
+    for doc in docs:
+        h.update(doc.page_content.encode())
+        h.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _shard_contents(shard: FAISS) -> Tuple[List[Document], np.ndarray]:
+    """Return a shard's documents and full-precision vectors in row order."""
+    rows = sorted(shard.index_to_docstore_id)
+    docs = [shard.docstore.search(shard.index_to_docstore_id[r]) for r in rows]
+    exact = getattr(shard, "exact_vectors", None)
+    if exact is not None:
+        # copy out of the memory-mapped file, which is removed on rebuild
+        return docs, np.array(exact, dtype=np.float32)
+    return docs, shard.index.reconstruct_n(0, shard.index.ntotal)
+
+
+class ShardedFAISS(VectorStore):
+    """Vector store that fans searches out over independent FAISS shards.
+
+    Each shard lives in its own sub-folder of `index_path` and can be rebuilt
+    on its own; `shards.json` maps shard keys to folders. Queries are embedded
+    once and searched on every shard in parallel, then merged by distance.
+    Call `close()` when done to stop the search threads.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        index_path: Path,
+        shard_by: str = "dir",
+        vector_storage: str = "flat",
+        max_workers: Optional[int] = None,
+        rerank_factor: Optional[int] = None,
+        data_dir: Optional[Path] = None,
+    ):
+        """Create an empty sharded store rooted at `index_path`.
+
+        `data_dir` is the folder that shard keys of file sources are relative
+        to; `sync` sets it.
+        """
+        if shard_by not in SHARD_BY:
+            raise ValueError(f"Unknown shard_by {shard_by!r}; use {SHARD_BY}")
+        self.embedding = embedding
+        self.index_path = index_path
+        self.shard_by = shard_by
+        self.vector_storage = vector_storage
+        self.rerank_factor = rerank_factor
+        self.data_dir = data_dir
+        self.shards: Dict[str, FAISS] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self._pool = ThreadPoolExecutor(max_workers or os.cpu_count())
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """Embedding model used for queries."""
+        return self.embedding
+
+    def close(self) -> None:
+        """Shut down the search thread pool."""
+        self._pool.shutdown(wait=False)
+
+    def __del__(self) -> None:
+        """Release the search threads when the store is garbage collected."""
+        pool = getattr(self, "_pool", None)
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    @staticmethod
+    def _shard_dir(key: str) -> str:
+        """Return the folder name of a shard."""
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    @classmethod
+    def load_local(
+        cls,
+        index_path: Path,
+        embedding: Embeddings,
+        max_workers: Optional[int] = None,
+        rerank_factor: Optional[int] = None,
+    ) -> "ShardedFAISS":
+        """Load every shard listed in the manifest under `index_path`.
+
+        `rerank_factor` overrides the one saved with each compressed shard.
+        """
+        manifest = json.loads((index_path / MANIFEST_FILE).read_text())
+        store = cls(
+            embedding,
+            index_path,
+            manifest["shard_by"],
+            manifest["vector_storage"],
+            max_workers,
+            rerank_factor,
+            Path(manifest["data_dir"]) if manifest.get("data_dir") else None,
+        )
+        for key, info in manifest["shards"].items():
+            store.shards[key] = load_vector_store(
+                index_path / info["dir"], embedding, rerank_factor
+            )
+            store.fingerprints[key] = info["fingerprint"]
+        logger.info(f"Loaded {len(store.shards)} FAISS shards.")
+        return store
+
+    def save_manifest(self) -> None:
+        """Write `shards.json` describing the current shards."""
+        manifest = {
+            "shard_by": self.shard_by,
+            "vector_storage": self.vector_storage,
+            "data_dir": str(self.data_dir) if self.data_dir else None,
+            "shards": {
+                key: {"dir": self._shard_dir(key), "fingerprint": fp}
+                for key, fp in self.fingerprints.items()
+            },
+        }
+        self.index_path.mkdir(parents=True, exist_ok=True)
+        (self.index_path / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+    def build_shard(
+        self,
+        key: str,
+        docs: List[Document],
+        vectors: Optional[List[List[float]]] = None,
+    ) -> None:
+        """(Re)build and save a single shard from `docs`.
+
+        Pass precomputed `vectors` to skip embedding. Call `save_manifest()`
+        afterwards to persist the shard list.
+        """
+        if vectors is None:
+            vectors = self.embedding.embed_documents([d.page_content for d in docs])
+        shard_path = self.index_path / self._shard_dir(key)
+        shutil.rmtree(shard_path, ignore_errors=True)
+        ids = [d.id for d in docs]
+        shard = FAISS.from_embeddings(
+            [(d.page_content, v) for d, v in zip(docs, vectors)],
+            self.embedding,
+            metadatas=[d.metadata for d in docs],
+            ids=ids if all(ids) else None,
+        )
+        shard = compress_vector_store(
+            shard, self.vector_storage, shard_path, self.rerank_factor
+        )
+        shard.save_local(shard_path)
+        self.shards[key] = shard
+        self.fingerprints[key] = _fingerprint(docs, self.vector_storage)
+
+    def drop_shard(self, key: str) -> None:
+        """Remove a shard from memory and disk."""
+        self.shards.pop(key, None)
+        self.fingerprints.pop(key, None)
+        shutil.rmtree(self.index_path / self._shard_dir(key), ignore_errors=True)
+
+    def sync(self, docs: List[Document], data_dir: Path) -> None:
+        """Bring the shards in line with `docs`, rebuilding only changed shards."""
+        self.data_dir = data_dir
+        groups: Dict[str, List[Document]] = {}
+        for doc in docs:
+            groups.setdefault(shard_key(doc, data_dir, self.shard_by), []).append(doc)
+
+        for key in set(self.shards) - set(groups):
+            logger.info(f"Dropping FAISS shard {key}")
+            self.drop_shard(key)
+
+        stale = [
+            key
+            for key, group in groups.items()
+            if self.fingerprints.get(key) != _fingerprint(group, self.vector_storage)
+        ]
+        logger.info(f"Rebuilding {len(stale)} of {len(groups)} FAISS shards...")
+        # embed all stale shards in one batched call
+        stale_docs = [doc for key in stale for doc in groups[key]]
+        with span("ingest.embed"):
+            vectors = (
+                self.embedding.embed_documents([d.page_content for d in stale_docs])
+                if stale_docs
+                else []
+            )
+        start = 0
+        for key in stale:
+            end = start + len(groups[key])
+            with span("ingest.faiss_build"):
+                self.build_shard(key, groups[key], vectors[start:end])
+            start = end
+        self.save_manifest()
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Search all shards in parallel and merge the top-k by L2 distance."""
+        futures = [
+            self._pool.submit(
+                shard.similarity_search_with_score_by_vector,
+                embedding,
+                k=k,
+                filter=filter,
+                fetch_k=fetch_k,
+                **kwargs,
+            )
+            for shard in self.shards.values()
+        ]
+        results = (pair for fut in futures for pair in fut.result())
+        return heapq.nsmallest(k, results, key=lambda pair: pair[1])
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Embed `query` once and search every shard."""
+        embedding = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        """Return the k documents most similar to `query` across all shards."""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed `texts` and rebuild the shards they belong to.
+
+        Existing documents of those shards keep their stored vectors, so only
+        the new texts are embedded. A later `sync` drops documents that are
+        not part of the docs it is given.
+        """
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+
+        groups: Dict[str, Tuple[List[Document], List[List[float]]]] = {}
+        for text, meta, id_, vec in zip(texts, metadatas, ids, vectors):
+            doc = Document(id=id_, page_content=text, metadata=meta)
+            key = shard_key(doc, self.data_dir, self.shard_by)
+            if key not in groups:
+                groups[key] = ([], [])
+                if key in self.shards:
+                    old_docs, old_vectors = _shard_contents(self.shards[key])
+                    groups[key] = (old_docs, list(old_vectors))
+            groups[key][0].append(doc)
+            groups[key][1].append(vec)
+
+        for key, (docs, shard_vectors) in groups.items():
+            with span("ingest.faiss_build"):
+                self.build_shard(key, docs, shard_vectors)
+        self.save_manifest()
+        return ids
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        *,
+        index_path: Path,
+        **kwargs: Any,
+    ) -> "ShardedFAISS":
+        """Build a sharded store under `index_path` from `texts`.
+
+        Remaining keyword arguments (`shard_by`, `vector_storage`, ...) are
+        passed to the constructor.
+        """
+        store = cls(embedding, index_path, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+
+def open_sharded_store(
+    index_path: Path,
+    embedding: Embeddings,
+    shard_by: str,
+    vector_storage: str = "flat",
+    rerank_factor: Optional[int] = None,
+) -> ShardedFAISS:
+    """Open the sharded index at `index_path` for an incremental rebuild.
+
+    Any existing index that is not sharded the same way is discarded.
+    """
+    if is_sharded(index_path):
+        store = ShardedFAISS.load_local(
+            index_path, embedding, rerank_factor=rerank_factor
+        )
+        if store.shard_by == shard_by:
+            store.vector_storage = vector_storage
+            store.rerank_factor = rerank_factor
+            return store
+        store.close()
+    shutil.rmtree(index_path, ignore_errors=True)
+    return ShardedFAISS(
+        embedding, index_path, shard_by, vector_storage, rerank_factor=rerank_factor
+    )
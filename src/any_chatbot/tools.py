@@ -9,15 +9,36 @@ from langchain.schema import Document
 from langchain_community.utilities.sql_database import SQLDatabase
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 
+from any_chatbot.metrics import inc, span
+from any_chatbot.rerank import Scorer, rerank as rerank_passages
+
 BASE = Path(__file__).parent.parent.parent
 DATA = BASE / "data"
-
-
-def initialize_retrieve_tool(vector_store: VectorStore):
+# metadata shown to the LLM when re-ranking; the rest only costs prompt tokens
+PROMPT_METADATA_KEYS = ("source", "table", "page_number")
+
+
+def initialize_retrieve_tool(
+    vector_store: VectorStore,
+    k: int = 5,
+    rerank: bool = False,
+    candidates: int = 20,
+    scorer: Scorer | None = None,
+    mmr_lambda: float = 0.7,
+    token_budget: int | None = 1200,
+):
     """Return a LangChain `@tool` that performs semantic search.
 
     Args:
         vector_store: A pre-built FAISS (or compatible) vector store.
+        k: Number of passages returned to the agent.
+        rerank: If set, fetch `candidates` passages, re-rank them with `scorer`
+            (lexical BM25 by default) and MMR (`mmr_lambda`), trim them to
+            `token_budget` estimated tokens and show only compact metadata.
+        candidates: Size of the candidate pool fetched when re-ranking.
+        scorer: Callable scoring (query, texts); see `any_chatbot.rerank`.
+        mmr_lambda: 1.0 ranks by relevance only; lower values favour diversity.
+        token_budget: Max estimated tokens of passage text when re-ranking.
 
     Returns:
         The decorated `retrieve` function ready to be passed into an agent.
@@ -37,13 +58,29 @@ def initialize_retrieve_tool(vector_store: VectorStore):
     def retrieve(
         query: str, tag: Literal["text_chunk", "image_text", "table_summary"]
     ) -> Tuple[str, List[Document]]:
-        retrieved_docs = vector_store.similarity_search(
-            query,
-            k=5,
-            filter={"source_type": tag},
-        )
+        with span("tool.retrieve"):
+            if not rerank:
+                retrieved_docs = vector_store.similarity_search(
+                    query,
+                    k=k,
+                    filter={"source_type": tag},
+                )
+            else:
+                pool = vector_store.similarity_search(
+                    query,
+                    k=candidates,
+                    filter={"source_type": tag},
+                    fetch_k=4 * candidates,
+                )
+                with span("tool.rerank"):
+                    retrieved_docs = rerank_passages(
+                        query, pool, k, scorer, mmr_lambda, token_budget
+                    )
         serialized = "\n\n".join(
-            (f"Source: {doc.metadata}\nContent: {doc.page_content}")
+            (
+                f"Source: {_prompt_metadata(doc) if rerank else doc.metadata}\n"
+                f"Content: {doc.page_content}"
+            )
             for doc in retrieved_docs
         )
         return serialized, retrieved_docs
@@ -51,6 +88,11 @@ def initialize_retrieve_tool(vector_store: VectorStore):
     return retrieve
 
 
+def _prompt_metadata(doc: Document) -> dict:
+    """Return the subset of a document's metadata worth showing the LLM."""
+    return {k: doc.metadata[k] for k in PROMPT_METADATA_KEYS if k in doc.metadata}
+
+
 def is_safe_sql(query: str) -> bool:
     """Reject queries that contain DML/DDL keywords.
 
@@ -78,15 +120,19 @@ def initialize_sql_toolkit(
     Returns:
         A list of LangChain tools for schema look-up and SELECT queries.
     """
-    db = SQLDatabase.from_uri(f"duckdb:///{db_path}")
+    with span("sql.schema_reflection"):
+        db = SQLDatabase.from_uri(f"duckdb:///{db_path}")
 
     # Monkey-path the run method to include safety filter
     original_run = db.run
 
     def safe_run(query: str, *args, **kwargs):
         if not is_safe_sql(query):
+            inc("anyfile_sql_queries_total", outcome="blocked")
             return "Query blocked: Only SELECT/PRAGMA queries are allowed."
-        return original_run(query, *args, **kwargs)
+        inc("anyfile_sql_queries_total", outcome="run")
+        with span("tool.sql"):
+            return original_run(query, *args, **kwargs)
 
     db.run = safe_run
 
@@ -0,0 +1,64 @@
+"""Unit tests for the offline benchmark harness: corpora and fakes."""
+
+from pathlib import Path
+
+import numpy as np
+import pypdf
+from langchain_core.tools import tool
+from langgraph.prebuilt import create_react_agent
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fakes import (
+    HashingEmbedding,
+    ScriptedChatModel,
+    retrieve_then_sql_script,
+)
+
+
+def test_generate_corpus_writes_every_format(tmp_path: Path) -> None:
+    """Test that each format gets its own folder and the PDFs are readable."""
+    counts = generate_corpus(tmp_path, "small")
+
+    for fmt, n in counts.items():
+        assert len(list((tmp_path / fmt).iterdir())) == n
+    pdf = pypdf.PdfReader(tmp_path / "pdf" / "pdf_0000.pdf")
+    assert pdf.pages[0].extract_text().strip()
+
+
+def test_hashing_embedding_is_deterministic_and_lexical() -> None:
+    """Test that texts sharing words embed closer than unrelated texts."""
+    emb = HashingEmbedding(size=256)
+    q = np.array(emb.embed_query("quarterly revenue growth"))
+    near, far = map(
+        np.array,
+        emb.embed_documents(["revenue growth was strong", "the cat sat down"]),
+    )
+
+    assert emb.embed_query("quarterly revenue growth") == q.tolist()
+    assert q @ near > q @ far
+    assert (emb.n_calls, emb.n_texts) == (3, 4)
+
+
+def test_scripted_chat_model_drives_agent_turn() -> None:
+    """Test that one agent turn replays the script and calls the tools."""
+    calls = []
+
+    @tool
+    def retrieve(query: str, tag: str) -> str:
+        """Fake retrieve tool."""
+        calls.append(("retrieve", query))
+        return "chunk"
+
+    @tool
+    def sql_db_query(query: str) -> str:
+        """Fake SQL tool."""
+        calls.append(("sql", query))
+        return "[(1,)]"
+
+    llm = ScriptedChatModel(script=retrieve_then_sql_script("revenue", "sales"))
+    agent = create_react_agent(llm, [retrieve, sql_db_query])
+    out = agent.invoke({"messages": [{"role": "user", "content": "hi"}]})
+
+    assert calls == [("retrieve", "revenue"), ("sql", "SELECT COUNT(*) FROM sales")]
+    assert out["messages"][-1].content == "Here is a summary of what I found."
+    assert llm.n_calls == 3
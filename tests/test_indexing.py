@@ -1,7 +1,19 @@
 """Unit tests for Anyfile-Agent modules: indexing."""
 
-from any_chatbot.indexing import _tbl, build_duckdb_and_summary_cards
+import json
+import os
+import time
+
+import any_chatbot.indexing as indexing
+from any_chatbot.indexing import (
+    _preprocess_image,
+    _tbl,
+    build_duckdb_and_summary_cards,
+    load_image_docs_as_text,
+    prune_ocr_cache,
+)
 from pathlib import Path
+from PIL import Image, ImageDraw, ImageSequence
 
 
 def test_tbl_cleaning():
@@ -26,3 +38,102 @@ def test_build_duckdb_and_summary_cards_csv(tmp_path: Path):
     assert card.metadata["table"] == "data"
     assert "TABLE CARD" in card.page_content
     assert "a:BIGINT" in card.page_content
+
+
+def _text_image(path: Path, size: tuple[int, int] = (200, 100)) -> None:
+    """Write an image with some dark text on a white background."""
+    img = Image.new("RGB", size, "white")
+    ImageDraw.Draw(img).text((10, 10), "hello world", fill="black", font_size=40)
+    img.save(path)
+
+
+def test_load_image_docs_as_text_uses_ocr_cache(tmp_path: Path, monkeypatch):
+    """Test that unchanged images are served from the OCR cache on rebuild."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _text_image(data_dir / "scan.png")
+    cache_dir = tmp_path / "ocr_cache"
+    calls = []
+
+    def fake_ocr(fp: Path) -> str:
+        calls.append(fp)
+        return "hello world"
+
+    monkeypatch.setattr(indexing, "_ocr_image", fake_ocr)
+
+    first = load_image_docs_as_text(data_dir, cache_dir)
+    second = load_image_docs_as_text(data_dir, cache_dir)
+
+    assert len(calls) == 1
+    assert [d.page_content for d in first] == ["hello world"]
+    assert [d.page_content for d in second] == ["hello world"]
+    assert second[0].metadata["source"] == str(data_dir / "scan.png")
+    assert second[0].metadata["source_type"] == "image_text"
+
+
+def test_preprocess_image_skips_blank_and_downsamples(tmp_path: Path):
+    """Test that blank images are skipped and oversized images are downsampled."""
+    blank = tmp_path / "blank.png"
+    Image.new("RGB", (300, 300), "white").save(blank)
+    assert _preprocess_image(blank, tmp_path, max_side=2000) is None
+
+    small = tmp_path / "small.png"
+    _text_image(small)
+    assert _preprocess_image(small, tmp_path, max_side=2000) == small
+
+    big = tmp_path / "big.jpg"
+    _text_image(big, size=(4000, 1000))
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    out = _preprocess_image(big, out_dir, max_side=2000)
+    with Image.open(out) as img:
+        assert max(img.size) == 2000
+
+
+def test_preprocess_image_keeps_every_tiff_page(tmp_path: Path):
+    """Test that a multi-page scan with a blank first page keeps all its pages."""
+    blank_page = Image.new("RGB", (2500, 3300), "white")
+    text_page = Image.new("RGB", (2500, 3300), "white")
+    ImageDraw.Draw(text_page).text((10, 10), "page two", fill="black", font_size=40)
+    scan = tmp_path / "scan.tiff"
+    blank_page.save(scan, save_all=True, append_images=[text_page])
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    out = _preprocess_image(scan, out_dir, max_side=2000)
+    assert out is not None
+    with Image.open(out) as img:
+        assert img.n_frames == 2
+        assert all(max(f.size) == 2000 for f in ImageSequence.Iterator(img))
+
+
+def test_prune_ocr_cache_drops_stale_entries(tmp_path: Path):
+    """Test that only OCR cache entries unused for longer than max age are pruned."""
+    fresh, stale = tmp_path / "fresh.json", tmp_path / "stale.json"
+    fresh.write_text("{}")
+    stale.write_text("{}")
+    old = time.time() - 31 * 86400
+    os.utime(stale, (old, old))
+
+    assert prune_ocr_cache(tmp_path, max_age_days=30) == 1
+    assert fresh.exists() and not stale.exists()
+
+
+def test_load_image_docs_as_text_recovers_from_corrupt_cache(
+    tmp_path: Path, monkeypatch
+):
+    """Test that a half-written OCR cache entry is treated as a miss and rewritten."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _text_image(data_dir / "scan.png")
+    cache_dir = tmp_path / "ocr_cache"
+    monkeypatch.setattr(indexing, "_ocr_image", lambda fp: "hello world")
+    load_image_docs_as_text(data_dir, cache_dir)
+    (entry,) = cache_dir.glob("*.json")
+    entry.write_text('{"text": "hel')
+
+    docs = load_image_docs_as_text(data_dir, cache_dir)
+
+    assert [d.page_content for d in docs] == ["hello world"]
+    assert json.loads(entry.read_text())["text"] == "hello world"
+    assert list(cache_dir.iterdir()) == [entry]
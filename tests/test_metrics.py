@@ -0,0 +1,69 @@
+"""Unit tests for Anyfile-Agent modules: metrics."""
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import create_react_agent
+
+from any_chatbot.metrics import (
+    REGISTRY,
+    InstrumentedEmbeddings,
+    MetricsCallbackHandler,
+    inc,
+    render_prometheus,
+    span,
+)
+from benchmarks.fakes import ScriptedChatModel
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    """Start every test from an empty metrics registry."""
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def test_span_and_counters_render_as_prometheus() -> None:
+    """Test that spans become histograms and counters keep their labels."""
+    with span("ingest.embed"):
+        pass
+    inc("anyfile_sql_queries_total", outcome="blocked")
+    inc("anyfile_sql_queries_total", outcome="blocked")
+
+    text = render_prometheus()
+    assert "# TYPE anyfile_stage_seconds histogram" in text
+    assert 'anyfile_stage_seconds_bucket{stage="ingest.embed",le="+Inf"} 1' in text
+    assert 'anyfile_stage_seconds_count{stage="ingest.embed"} 1' in text
+    assert 'anyfile_sql_queries_total{outcome="blocked"} 2' in text
+
+
+def test_instrumented_embeddings_counts_calls_and_texts() -> None:
+    """Test that wrapped embeddings count calls, texts and estimated tokens."""
+    emb = InstrumentedEmbeddings(DeterministicFakeEmbedding(size=8))
+    emb.embed_documents(["abcd" * 10, "efgh"])
+    emb.embed_query("hello")
+
+    text = render_prometheus()
+    assert "anyfile_embedding_calls_total 2" in text
+    assert "anyfile_embedding_texts_total 3" in text
+    assert "anyfile_embedding_tokens_total 12" in text
+
+
+def test_callback_handler_times_agent_steps_and_counts_llm_calls() -> None:
+    """Test that each LangGraph node run and chat model call is recorded."""
+    answer = AIMessage(
+        content="done",
+        usage_metadata={"input_tokens": 10, "output_tokens": 3, "total_tokens": 13},
+    )
+    agent = create_react_agent(ScriptedChatModel(script=[answer]), [])
+    agent.invoke(
+        {"messages": [{"role": "user", "content": "hi"}]},
+        config={"callbacks": [MetricsCallbackHandler()]},
+    )
+
+    text = render_prometheus()
+    assert "anyfile_llm_calls_total 1" in text
+    assert 'anyfile_llm_tokens_total{kind="input"} 10' in text
+    assert 'anyfile_llm_tokens_total{kind="output"} 3' in text
+    assert 'anyfile_stage_seconds_count{node="agent",stage="agent.step"} 1' in text
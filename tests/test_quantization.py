@@ -0,0 +1,110 @@
+"""Unit tests for Anyfile-Agent modules: quantization."""
+
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from any_chatbot.quantization import (
+    DEFAULT_RERANK_FACTOR,
+    CompressedFAISS,
+    build_compressed_index,
+    compress_vector_store,
+    load_vector_store,
+)
+
+
+def _flat_store(n: int = 300) -> FAISS:
+    """Build a flat FAISS store over `n` fake-embedded documents."""
+    docs = [
+        Document(
+            page_content=f"document number {i}",
+            metadata={"source_type": "text_chunk" if i % 2 else "image_text"},
+        )
+        for i in range(n)
+    ]
+    return FAISS.from_documents(docs, DeterministicFakeEmbedding(size=64))
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "pq"])
+def test_build_compressed_index_is_smaller(storage: str) -> None:
+    """Test that compressed indexes hold every vector in fewer bytes than flat."""
+    vectors = np.random.default_rng(0).normal(size=(500, 64)).astype(np.float32)
+    flat = build_compressed_index(vectors, "flat")
+    compressed = build_compressed_index(vectors, storage)
+
+    assert compressed.ntotal == 500
+    assert compressed.sa_code_size() < flat.sa_code_size()
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "pq"])
+def test_compressed_store_matches_flat_results(tmp_path: Path, storage: str) -> None:
+    """Test that exact re-ranking returns the same top-k as the flat index."""
+    flat = _flat_store()
+    compressed = compress_vector_store(_flat_store(), storage, tmp_path)
+    assert isinstance(compressed, CompressedFAISS)
+
+    query = "document number 42"
+    filt = {"source_type": "text_chunk"}
+    expected = flat.similarity_search_with_score(query, k=5, filter=filt)
+    got = compressed.similarity_search_with_score(query, k=5, filter=filt)
+
+    assert [d.page_content for d, _ in got] == [d.page_content for d, _ in expected]
+    assert all(d.metadata["source_type"] == "text_chunk" for d, _ in got)
+
+
+def test_load_vector_store_roundtrip(tmp_path: Path) -> None:
+    """Test that a saved compressed store loads back as a CompressedFAISS."""
+    compressed = compress_vector_store(_flat_store(), "int8", tmp_path)
+    compressed.save_local(tmp_path)
+
+    loaded = load_vector_store(tmp_path, DeterministicFakeEmbedding(size=64))
+    assert isinstance(loaded, CompressedFAISS)
+    assert loaded.similarity_search("document number 7", k=1)[0].page_content == (
+        "document number 7"
+    )
+
+
+def test_pq_falls_back_on_tiny_index(tmp_path: Path) -> None:
+    """Test that PQ on a single vector falls back instead of failing to train."""
+    compressed = compress_vector_store(_flat_store(n=1), "pq", tmp_path)
+
+    assert compressed.index.ntotal == 1
+    assert compressed.similarity_search("document number 0", k=1)[0].page_content == (
+        "document number 0"
+    )
+
+
+def test_rerank_factor_is_saved_with_index(tmp_path: Path) -> None:
+    """Test that the rerank factor round-trips and can be overridden on load."""
+    embedding = DeterministicFakeEmbedding(size=64)
+    compressed = compress_vector_store(_flat_store(), "pq", tmp_path, rerank_factor=8)
+    compressed.save_local(tmp_path)
+
+    assert load_vector_store(tmp_path, embedding).rerank_factor == 8
+    assert load_vector_store(tmp_path, embedding, rerank_factor=2).rerank_factor == 2
+    assert compress_vector_store(_flat_store(), "pq", tmp_path / "d").rerank_factor == (
+        DEFAULT_RERANK_FACTOR["pq"]
+    )
+
+
+def test_add_documents_rebuilds_compressed_index(tmp_path: Path) -> None:
+    """Test that documents added to a compressed store are searchable after reload."""
+    embedding = DeterministicFakeEmbedding(size=64)
+    store = compress_vector_store(_flat_store(n=1), "pq", tmp_path / "build")
+    assert isinstance(store.index, faiss.IndexScalarQuantizer)  # too small for PQ
+
+    new_docs = [Document(page_content=f"added document {i}") for i in range(300)]
+    ids = store.add_documents(new_docs)
+    assert isinstance(store.index, faiss.IndexPQ)
+    assert store.index.ntotal == len(store.exact_vectors) == 301
+
+    store.save_local(tmp_path / "saved")
+    loaded = load_vector_store(tmp_path / "saved", embedding)
+    assert isinstance(loaded, CompressedFAISS) and loaded.storage == "pq"
+    hit = loaded.similarity_search("added document 42", k=1)[0]
+    assert (hit.id, hit.page_content) == (ids[42], "added document 42")
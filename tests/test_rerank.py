@@ -0,0 +1,71 @@
+"""Unit tests for Anyfile-Agent modules: rerank."""
+
+import numpy as np
+from langchain.schema import Document
+
+from any_chatbot.rerank import lexical_scores, mmr_select, rerank, trim_to_budget
+
+
+def test_lexical_scores_prefers_query_terms() -> None:
+    """Test that texts sharing rarer query terms score higher."""
+    scores = lexical_scores(
+        "quarterly revenue",
+        ["revenue grew this quarter", "the cat sat", "quarterly revenue report"],
+    )
+    assert scores[2] > scores[0] > scores[1] == 0
+
+
+def test_mmr_select_skips_near_duplicates() -> None:
+    """Test that MMR picks a diverse second result over a duplicate."""
+    relevance = np.array([1.0, 0.95, 0.6])
+    similarity = np.array([[1.0, 1.0, 0.0], [1.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+
+    assert mmr_select(relevance, similarity, 2, mmr_lambda=1.0) == [0, 1]
+    assert mmr_select(relevance, similarity, 2, mmr_lambda=0.5) == [0, 2]
+
+
+def test_trim_to_budget_cuts_last_passage() -> None:
+    """Test that passages are kept in order and the overflow is truncated."""
+    docs = [Document(page_content="a " * 20), Document(page_content="b " * 20)]
+    kept = trim_to_budget(docs, token_budget=15)
+
+    assert len(kept) == 2
+    assert kept[0] is docs[0]
+    assert kept[1].page_content.startswith("b b") and kept[1].page_content.endswith("…")
+    assert docs[1].page_content == "b " * 20
+
+
+def test_rerank_promotes_lexical_match_and_drops_duplicates() -> None:
+    """Test the full pipeline: relevant passage first, duplicate removed."""
+    candidates = [
+        Document(page_content="shipping logistics update for europe"),
+        Document(page_content="shipping logistics update for europe"),
+        Document(page_content="dividend policy for shareholders in 2024"),
+        Document(page_content="board approved the annual dividend"),
+    ]
+    docs = rerank("annual dividend", candidates, k=2, mmr_lambda=0.6)
+
+    assert docs[0].page_content == "board approved the annual dividend"
+    assert len({d.page_content for d in docs}) == 2
+
+
+def test_trim_to_budget_keeps_table_schemas() -> None:
+    """Test that table cards lose sample rows, never their schema or the card."""
+    columns = ", ".join(f"col_{i}:VARCHAR" for i in range(40))
+    rows = "\n".join(f"row {i} " + "x" * 60 for i in range(5))
+    cards = [
+        Document(
+            page_content=(
+                f"TABLE CARD — t{n}\nColumns: {columns}\nRows: 5\n\n"
+                f"Sample rows (up to 5):\ncol_0 col_1\n{rows}\n"
+            ),
+            metadata={"source_type": "table_summary", "table": f"t{n}"},
+        )
+        for n in range(3)
+    ]
+    kept = trim_to_budget(cards, token_budget=250)
+
+    assert [d.metadata["table"] for d in kept] == ["t0", "t1", "t2"]
+    assert all(columns in d.page_content for d in kept)
+    assert "row 0" in kept[0].page_content
+    assert "Sample rows" not in kept[2].page_content
@@ -0,0 +1,161 @@
+"""Unit tests for Anyfile-Agent modules: sharding."""
+
+from pathlib import Path
+
+import pytest
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from any_chatbot.quantization import CompressedFAISS
+from any_chatbot.sharding import (
+    TABLES_SHARD,
+    ShardedFAISS,
+    open_sharded_store,
+    shard_key,
+)
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """A fake embedding model that counts embedded documents."""
+
+    n_embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Record how many texts were embedded, then embed them."""
+        self.n_embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def _docs(data_dir: Path) -> list[Document]:
+    """Return documents spread over two directories plus a table card."""
+    docs = [
+        Document(
+            page_content=f"{folder} chunk {i}",
+            metadata={
+                "source": str(data_dir / folder / f"f{i}.txt"),
+                "source_type": "text_chunk",
+            },
+        )
+        for folder in ("reports", "notes")
+        for i in range(10)
+    ]
+    docs.append(
+        Document(
+            page_content="TABLE CARD — sales",
+            metadata={"source_type": "table_summary", "table": "sales"},
+        )
+    )
+    return docs
+
+
+def test_shard_key(tmp_path: Path) -> None:
+    """Test that documents map to their source file, directory or the table shard."""
+    doc = Document(page_content="x", metadata={"source": str(tmp_path / "a/b.pdf")})
+    assert shard_key(doc, tmp_path, "file") == "a/b.pdf"
+    assert shard_key(doc, tmp_path, "dir") == "a"
+    assert shard_key(Document(page_content="x"), tmp_path, "dir") == TABLES_SHARD
+
+
+def test_sharded_search_matches_single_index(tmp_path: Path) -> None:
+    """Test that fan-out search over shards returns the same top-k as one index."""
+    embedding = DeterministicFakeEmbedding(size=32)
+    docs = _docs(tmp_path / "data")
+    store = ShardedFAISS(embedding, tmp_path / "index", shard_by="dir")
+    store.sync(docs, tmp_path / "data")
+    single = FAISS.from_documents(docs, embedding)
+
+    assert set(store.shards) == {"reports", "notes", TABLES_SHARD}
+    filt = {"source_type": "text_chunk"}
+    got = store.similarity_search("reports chunk 3", k=5, filter=filt)
+    expected = single.similarity_search("reports chunk 3", k=5, filter=filt)
+    assert [d.page_content for d in got] == [d.page_content for d in expected]
+
+
+def test_sync_rebuilds_only_changed_shards(tmp_path: Path) -> None:
+    """Test that re-syncing after loading re-embeds only the changed shard."""
+    embedding = CountingEmbedding(size=32)
+    docs = _docs(tmp_path / "data")
+    ShardedFAISS(embedding, tmp_path / "index").sync(docs, tmp_path / "data")
+    assert embedding.n_embedded == len(docs)
+
+    docs[0].page_content = "reports chunk 0 (edited)"
+    store = ShardedFAISS.load_local(tmp_path / "index", embedding)
+    store.sync(docs, tmp_path / "data")
+
+    assert embedding.n_embedded == len(docs) + 10
+    hits = store.similarity_search("reports chunk 0 (edited)", k=1)
+    assert hits[0].page_content == "reports chunk 0 (edited)"
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "pq"])
+def test_tiny_shards_use_requested_storage(tmp_path: Path, storage: str) -> None:
+    """Test that one-document file shards are compressed and load back."""
+    embedding = DeterministicFakeEmbedding(size=32)
+    data_dir = tmp_path / "data"
+    docs = [
+        Document(
+            page_content=f"scan {i}", metadata={"source": str(data_dir / f"{i}.png")}
+        )
+        for i in range(3)
+    ]
+    store = ShardedFAISS(embedding, tmp_path / "index", "file", storage)
+    store.sync(docs, data_dir)
+    store.close()
+
+    loaded = ShardedFAISS.load_local(tmp_path / "index", embedding)
+    assert len(loaded.shards) == 3
+    assert all(isinstance(s, CompressedFAISS) for s in loaded.shards.values())
+    assert loaded.similarity_search("scan 1", k=1)[0].page_content == "scan 1"
+    loaded.close()
+
+
+def test_add_documents_extends_shards(tmp_path: Path) -> None:
+    """Test the standard VectorStore API: from_documents, then add_documents."""
+    embedding = CountingEmbedding(size=32)
+    docs = _docs(tmp_path / "data")
+    store = ShardedFAISS.from_documents(
+        docs,
+        embedding,
+        index_path=tmp_path / "index",
+        shard_by="dir",
+        data_dir=tmp_path / "data",
+    )
+    new_doc = Document(
+        page_content="reports chunk 99",
+        metadata={"source": str(tmp_path / "data" / "reports" / "new.txt")},
+    )
+    ids = store.add_documents([new_doc])
+
+    assert embedding.n_embedded == len(docs) + 1
+    assert len(store.shards) == 3
+    hit = store.similarity_search("reports chunk 99", k=1)[0]
+    assert (hit.id, hit.page_content) == (ids[0], "reports chunk 99")
+
+    loaded = ShardedFAISS.load_local(tmp_path / "index", embedding)
+    assert loaded.shards["reports"].index.ntotal == 11
+    loaded.close()
+    store.close()
+
+
+def test_open_sharded_store_closes_discarded_store(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a store loaded and then discarded has its thread pool shut down."""
+    embedding = DeterministicFakeEmbedding(size=32)
+    ShardedFAISS(embedding, tmp_path / "index", "dir").sync(
+        _docs(tmp_path / "data"), tmp_path / "data"
+    )
+    closed = []
+    original_close = ShardedFAISS.close
+
+    def close(self: ShardedFAISS) -> None:
+        """Record which store was closed, then close it."""
+        closed.append(self.shard_by)
+        original_close(self)
+
+    monkeypatch.setattr(ShardedFAISS, "close", close)
+    store = open_sharded_store(tmp_path / "index", embedding, "file")
+
+    assert closed == ["dir"]
+    assert store.shard_by == "file" and not store.shards
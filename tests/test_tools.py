@@ -35,3 +35,41 @@ def test_is_safe_sql() -> None:
     assert is_safe_sql("SELECT updated_at FROM tbl")
     assert not is_safe_sql("DROP TABLE tbl")
     assert not is_safe_sql("UPDATE tbl SET a=1")
+
+
+class PoolStore:
+    """A fake vector store returning a fixed candidate pool."""
+
+    def __init__(self, docs: list[Document]):
+        self.docs = docs
+        self.calls = []
+
+    def similarity_search(
+        self, query: str, k: int = 5, filter: dict | None = None, **kwargs
+    ) -> list[Document]:
+        """Record the call and return up to k candidates."""
+        self.calls.append((query, k, filter, kwargs))
+        return self.docs[:k]
+
+
+def test_retrieve_tool_reranks_candidate_pool() -> None:
+    """Test that re-ranking fetches a larger pool and returns compact passages."""
+    docs = [
+        Document(
+            page_content=f"filler passage {i}",
+            metadata={"source": f"f{i}.txt", "start_index": 0},
+        )
+        for i in range(10)
+    ]
+    docs[7].page_content = "the annual dividend was raised"
+    store = PoolStore(docs)
+    retrieve = initialize_retrieve_tool(store, k=3, rerank=True, candidates=10)
+    text, out = retrieve.func("annual dividend", "text_chunk")
+
+    assert store.calls == [
+        ("annual dividend", 10, {"source_type": "text_chunk"}, {"fetch_k": 40})
+    ]
+    assert len(out) == 3
+    assert out[0].page_content == "the annual dividend was raised"
+    assert "start_index" not in text
+    assert "'source': 'f7.txt'" in text